@@ -1,5 +1,8 @@
+from functools import partial
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from app.api.deps import get_authenticated_user
+from app.api.deps import get_authenticated_user, get_page_params, paginate, sparse_fields
+from app.core.dependencies import db_released
+from app.core.serialization import narrow_model
 from app.models.contract import ContractCreate, ContractResponse
 from app.services.contracts import ContractService
 from app.services.deals import DealService
@@ -11,13 +14,21 @@ router = APIRouter()
 
 
 @router.get("/contracts", response_model=List[ContractResponse])
-async def get_contracts(deps: dict = Depends(get_authenticated_user)):
-    """Get all contracts for the current user."""
+async def get_contracts(
+    page: dict = Depends(get_page_params),
+    fields: tuple = Depends(sparse_fields(ContractResponse)),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Get a page of contracts for the current user, newest first. `fields`
+    limits each contract to the listed fields.
+    """
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    contracts = await ContractService.get_contracts(db, user_id)
-    return contracts
+    return await paginate(
+        partial(ContractService.get_contracts, db, user_id, **page), narrow_model(ContractResponse, fields)
+    )
 
 
 @router.post("/contracts", response_model=ContractResponse, status_code=status.HTTP_201_CREATED)
@@ -40,9 +51,10 @@ async def upload_contract(
             detail="Deal not found"
         )
     
-    # Upload file to Supabase Storage
+    # Stream file to contract storage, without holding a pool slot meanwhile
     try:
-        file_url = await storage_service.upload_file(file, deal_id, user_id)
+        async with db_released(deps["slot"]):
+            file_url = await storage_service.upload_file(file, deal_id, user_id)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -71,31 +83,12 @@ async def delete_contract(
     contract_id: int,
     deps: dict = Depends(get_authenticated_user)
 ):
-    """Delete a contract and its file."""
+    """Delete a contract. Its file is removed from storage in the background."""
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    # Get existing contract to verify ownership
-    existing = await ContractService.get_contract(db, contract_id)
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contract not found"
-        )
-    
-    # Verify the deal belongs to the user
-    deal = await DealService.get_deal(db, existing.dealId, user_id)
-    if not deal:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Unauthorized"
-        )
-    
-    # Delete file from Supabase Storage
-    await storage_service.delete_file(existing.fileUrl)
-    
-    # Delete contract record
-    deleted = await ContractService.delete_contract(db, contract_id)
+    # Delete contract record (ownership-checked) and queue the file deletion
+    deleted = await ContractService.delete_contract(db, contract_id, user_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
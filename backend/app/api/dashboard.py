@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from app.api.deps import get_authenticated_user
+from app.models.dashboard import DashboardSummary
+from app.services.dashboard import DashboardService
+
+router = APIRouter()
+
+
+@router.get("/dashboard/summary", response_model=DashboardSummary)
+async def get_dashboard_summary(
+    days: int = Query(7, ge=1, le=365),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Get dashboard totals for the current user: pipeline value by status,
+    paid revenue by platform, paid vs. outstanding payments and the number
+    of unsent reminders due within the next `days` days.
+    """
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    return await DashboardService.get_summary(db, user_id, days)
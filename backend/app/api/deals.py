@@ -1,39 +1,177 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.deps import get_authenticated_user
-from app.models.deal import DealCreate, DealUpdate, DealResponse
-from app.services.deals import DealService
-from typing import List
+from functools import partial
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from app.api.deps import (
+    Flight, check_batch_delete, check_conditional, conditional_get, get_authenticated_user,
+    get_flight_key, get_page_params, paginate, sparse_fields, validate_batch
+)
+from app.core.serialization import JSONBytesResponse, dump_one, narrow_model
+from app.models.deal import DealBatchUpdate, DealCreate, DealUpdate, DealResponse, DealDetailResponse
+from app.models.batch import BatchDelete, BatchResponse, outcome_ids
+from app.services.deals import DEAL_RELATIONS, DealService
+from app.services.versions import VERSIONED_RESOURCES
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
 
 router = APIRouter()
 
+_RELATION = f"({'|'.join(DEAL_RELATIONS)})"
 
-@router.get("/deals", response_model=List[DealResponse])
-async def get_deals(deps: dict = Depends(get_authenticated_user)):
-    """Get all deals for the current user."""
+
+def get_deal_filters(
+    status: Optional[str] = Query(None, pattern="^(lead|negotiation|signed|content_delivered|paid)$"),
+    platform: Optional[str] = Query(None, pattern="^(instagram|youtube|tiktok|twitter|linkedin|other)$"),
+    deadline_from: Optional[datetime] = Query(None, alias="deadlineFrom"),
+    deadline_to: Optional[datetime] = Query(None, alias="deadlineTo"),
+    min_value: Optional[Decimal] = Query(None, alias="minValue", ge=0),
+    max_value: Optional[Decimal] = Query(None, alias="maxValue", ge=0),
+    sort: str = Query("createdAt", pattern="^(createdAt|deadline|dealValue)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$")
+) -> dict:
+    """Filter and sort parameters for GET /deals."""
+    return {
+        "filters": {
+            "status": status,
+            "platform": platform,
+            "deadline_from": deadline_from,
+            "deadline_to": deadline_to,
+            "min_value": min_value,
+            "max_value": max_value,
+        },
+        "sort": sort,
+        "order": order,
+    }
+
+
+def get_deal_include(
+    include: Optional[str] = Query(None, pattern=f"^{_RELATION}(,{_RELATION})*$")
+) -> Tuple[str, ...]:
+    """Related collections to embed, from ?include=payments,contracts,reminders."""
+    if not include:
+        return ()
+    return tuple(dict.fromkeys(include.split(",")))
+
+
+def get_deal_fields(
+    include: Tuple[str, ...] = Depends(get_deal_include),
+    fields: Tuple[str, ...] = Depends(sparse_fields(DealDetailResponse))
+) -> Tuple[str, ...]:
+    """
+    `fields` for deals. A relation is only a field of the response when
+    it is included, so naming one without `include` is a 400.
+    """
+    missing = [name for name in fields if name in DEAL_RELATIONS and name not in include]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Fields {', '.join(missing)} need include={','.join(missing)}"
+        )
+    return fields
+
+
+async def get_deal_validators(
+    request: Request,
+    response: Response,
+    include: Tuple[str, ...] = Depends(get_deal_include),
+    deps: dict = Depends(get_authenticated_user)
+) -> Dict[str, str]:
+    """
+    conditional_get("deals") extended to the relations in `include`, so
+    the ETag changes when an embedded payment or reminder does. Contracts
+    have no version stamp, so responses embedding them are not conditional.
+    """
+    if "contracts" in include:
+        return {}
+    resources = ("deals", *sorted(r for r in include if r in VERSIONED_RESOURCES))
+    return await check_conditional(
+        request, response, deps["db"], deps["user"]["user_id"], resources
+    )
+
+
+@router.get("/deals", response_model=List[DealDetailResponse])
+async def get_deals(
+    page: dict = Depends(get_page_params),
+    view: dict = Depends(get_deal_filters),
+    include: Tuple[str, ...] = Depends(get_deal_include),
+    fields: Tuple[str, ...] = Depends(get_deal_fields),
+    validators: dict = Depends(get_deal_validators),
+    flight: Flight = Depends(get_flight_key),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Get a page of deals for the current user, newest first by default.
+    Filter by status, platform, deadline range and value range, and sort
+    by createdAt, deadline or dealValue in either direction. A cursor is
+    only valid for the sort it was issued with. `include` embeds each
+    deal's payments, contracts and/or reminders; relations not asked for
+    are null. `fields` limits each deal to the listed fields.
+    """
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    deals = await DealService.get_deals(db, user_id)
-    return deals
+    return await paginate(
+        partial(DealService.get_deals, db, user_id, **page, **view, include=include, fields=fields),
+        narrow_model(DealDetailResponse if include else DealResponse, fields),
+        validators,
+        flight
+    )
+
 
+@router.get("/deals/search", response_model=List[DealResponse])
+async def search_deals(
+    q: str = Query(..., min_length=1, max_length=100),
+    page: dict = Depends(get_page_params),
+    validators: dict = Depends(conditional_get("deals")),
+    flight: Flight = Depends(get_flight_key),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Search the current user's deals by brand name and notes, best match
+    first. Brand names match by prefix, substring or similar spelling;
+    notes match by substring. Paginated like the other list endpoints.
+    """
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    query = q.strip()
+    if not query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must not be blank"
+        )
+    
+    return await paginate(
+        partial(DealService.search_deals, db, user_id, query, **page), DealResponse, validators, flight
+    )
 
-@router.get("/deals/{deal_id}", response_model=DealResponse)
+
+@router.get("/deals/{deal_id}", response_model=DealDetailResponse)
 async def get_deal(
     deal_id: int,
+    include: Tuple[str, ...] = Depends(get_deal_include),
+    fields: Tuple[str, ...] = Depends(get_deal_fields),
+    validators: dict = Depends(get_deal_validators),
     deps: dict = Depends(get_authenticated_user)
 ):
-    """Get a single deal by ID."""
+    """
+    Get a single deal by ID. `include` embeds its payments, contracts
+    and/or reminders, read together with the deal; relations not asked
+    for are null. `fields` limits the response to the listed fields.
+    """
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    deal = await DealService.get_deal(db, deal_id, user_id)
+    # Read fresh: a cached copy from before another worker's update would be
+    # served under the new ETag and then kept alive by 304s
+    deal = await DealService.get_deal(db, deal_id, user_id, include, cached=False)
     if not deal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    return deal
+    model = narrow_model(DealDetailResponse if include else DealResponse, fields)
+    return JSONBytesResponse(dump_one(model, deal), headers=validators)
 
 
 @router.post("/deals", response_model=DealResponse, status_code=status.HTTP_201_CREATED)
@@ -87,3 +225,50 @@ async def delete_deal(
     
     return {"message": "Deal deleted successfully"}
 
+
+@router.post("/deals:batch", response_model=BatchResponse)
+async def create_deals_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Create several deals at once. Each item is validated on its own and
+    the valid ones are written in one transaction; the response has one
+    result per item, in order.
+    """
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    indexes, valid, errors = validate_batch(items, DealCreate)
+    rows = await DealService.create_deals(db, user_id, valid) if valid else []
+    return BatchResponse.build(len(items), errors, outcome_ids(indexes, rows), "Deal not found")
+
+
+@router.patch("/deals:batch", response_model=BatchResponse)
+async def update_deals_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Update several deals at once. Each item carries its `id` and the fields to change."""
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    indexes, valid, errors = validate_batch(items, DealBatchUpdate)
+    updates = [(item.id, item) for item in valid]
+    rows = await DealService.update_deals(db, user_id, updates) if updates else []
+    return BatchResponse.build(len(items), errors, outcome_ids(indexes, rows), "Deal not found")
+
+
+@router.post("/deals:batchDelete", response_model=BatchResponse)
+async def delete_deals_batch(
+    body: BatchDelete,
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Delete several deals at once."""
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    check_batch_delete(body.ids)
+    deleted = await DealService.delete_deals(db, user_id, body.ids)
+    outcomes = {index: item_id if ok else None for index, (item_id, ok) in enumerate(zip(body.ids, deleted))}
+    return BatchResponse.build(len(body.ids), {}, outcomes, "Deal not found")
@@ -1,17 +1,346 @@
-from fastapi import Depends
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import timezone
+from email.utils import format_datetime
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from app.core.auth import get_current_user
-from app.core.dependencies import get_db
-from app.prisma_client import Prisma
-from typing import Dict
+from app.core.config import settings
+from app.core.database import PoolSlot
+from app.core.dependencies import db_released, get_db
+from app.core.serialization import JSONBytesResponse, dump_json, field_names
+from app.services.pagination import Page
+from app.services.versions import VersionService
+from prisma import Prisma
+from pydantic import BaseModel, ValidationError
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class SingleFlight:
+    """
+    Lets identical concurrent GETs share one computation. The first request
+    for a key runs it in its own task; requests arriving with the same key
+    while it runs await that task instead of running their own. Keys are
+    dropped as soon as the computation finishes, so nothing is cached.
+    """
+
+    def __init__(self):
+        self._flights: Dict[tuple, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(
+        self,
+        key: tuple,
+        compute: Callable[[], Awaitable[Any]],
+        joined: Optional[Callable[[], AsyncContextManager]] = None
+    ) -> Any:
+        """
+        Run `compute` or join the running computation for `key`. A
+        request that joins waits inside `joined()`, if given, e.g. with
+        its pool slot handed back since the leader does the querying.
+        """
+        task = self._flights.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(compute())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+            if joined is not None:
+                async with joined():
+                    return await asyncio.shield(task)
+        # Shielded so a client disconnecting does not cancel the others' result
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def invalidate(self, user_id: str) -> None:
+        """Stop later requests from joining any of this user's running computations."""
+        for key in [key for key in self._flights if key[0] == user_id]:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "in_flight": len(self._flights),
+        }
+
+
+single_flight = SingleFlight()
 
 
 def get_authenticated_user(
+    request: Request,
     user: Dict = Depends(get_current_user),
     db: Prisma = Depends(get_db)
 ):
     """
     Combined dependency that provides both authenticated user and database.
     Use this in routes that need both authentication and database access.
+    The database is the process-wide pooled client from app.core.database;
+    "slot" is the request's pool slot, for db_released().
+
+    Any other method than GET/HEAD is treated as a possible mutation and
+    detaches the user's in-flight list computations from single_flight.
+    """
+    if request.method not in ("GET", "HEAD"):
+        single_flight.invalidate(user["user_id"])
+    return {"user": user, "db": db, "slot": request.state.db_slot}
+
+
+class Flight(NamedTuple):
+    """Single-flight key of a list GET, plus the request's pool slot."""
+    user_id: str
+    url: str
+    slot: PoolSlot
+
+
+def get_flight_key(
+    request: Request,
+    deps: dict = Depends(get_authenticated_user)
+) -> Flight:
+    """
+    Single-flight key of a list GET: the user and the full URL, so page,
+    cursor, filters and sort all take part. paginate() adds the ETag.
+    """
+    return Flight(deps["user"]["user_id"], f"{request.url.path}?{request.url.query}", deps["slot"])
+
+
+def sparse_fields(model: Type[BaseModel]):
+    """
+    Dependency factory for `?fields=id,brandName,...`. Returns the
+    requested field names of `model` (camelCase, as in the response) in
+    the model's field order, or an empty tuple for all fields; unknown
+    names are a 400. Pass the result to narrow_model() to build the
+    response.
+    """
+    allowed = field_names(model)
+
+    def dependency(fields: Optional[str] = Query(None)) -> Tuple[str, ...]:
+        if fields is None:
+            return ()
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(requested.difference(allowed))
+        if not requested or unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                       f"Expected some of: {', '.join(allowed)}"
+            )
+        # Model order, so every spelling of a field set shares one narrowed model
+        return tuple(name for name in allowed if name in requested)
+
+    return dependency
+
+
+def get_page_params(
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None)
+) -> Dict:
     """
-    return {"user": user, "db": db}
+    Keyset pagination parameters shared by the list endpoints. Without
+    limit or cursor the whole list is returned, so clients that do not
+    follow X-Next-Cursor still see every row; a cursor on its own pages
+    by PAGE_SIZE_DEFAULT.
+    """
+    if limit is None and cursor:
+        limit = settings.PAGE_SIZE_DEFAULT
+    return {"limit": limit, "cursor": cursor}
+
+
+class ConditionalStats:
+    """Counts conditional GETs and how many were answered with 304."""
+
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "not_modified_ratio": self.not_modified / self.requests if self.requests else 0.0,
+        }
+
+
+conditional_stats = ConditionalStats()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match list (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return any(opaque(candidate) == opaque(etag) for candidate in if_none_match.split(","))
+
+
+async def check_conditional(
+    request: Request,
+    response: Response,
+    db: Prisma,
+    user_id: str,
+    resources: Tuple[str, ...]
+) -> Dict[str, str]:
+    """
+    Build an ETag from the user's version stamps of `resources`, the user
+    and the request URL, and answer a matching If-None-Match with 304 before the
+    route reads any rows. Otherwise the validators are set on the
+    response and also returned, for routes that build their own response.
+
+    The stamps are read before the rows, so a concurrent mutation can only
+    pair an old ETag with new data, which costs one extra 200 later and
+    never serves stale data.
+    """
+    stamps = [
+        await VersionService.get_version(db, user_id, resource)
+        for resource in resources
+    ]
+    versions = ".".join(str(version) for version, _ in stamps)
+    changed = [updated_at for _, updated_at in stamps if updated_at]
+    # Page, cursor and filters select the representation. Every user's
+    # stamps start from the same small numbers, so the user is hashed in too:
+    # otherwise one user's cached body could be revalidated by another.
+    url_hash = hashlib.blake2b(
+        f"{user_id}\n{request.url.path}?{request.url.query}".encode(), digest_size=8
+    ).hexdigest()
+    headers = {
+        "ETag": f'W/"{versions}-{url_hash}"',
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if changed:
+        headers["Last-Modified"] = format_datetime(
+            max(changed).astimezone(timezone.utc), usegmt=True
+        )
+
+    conditional_stats.requests += 1
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        conditional_stats.not_modified += 1
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return headers
+
+
+def conditional_get(resource: str):
+    """
+    Dependency factory for GET routes over one of the versioned resources
+    (see VersionService); see check_conditional.
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        deps: dict = Depends(get_authenticated_user)
+    ) -> Dict[str, str]:
+        return await check_conditional(
+            request, response, deps["db"], deps["user"]["user_id"], (resource,)
+        )
+
+    return dependency
+
+
+async def paginate(
+    fetch: Callable[[], Awaitable[Page]],
+    model: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None,
+    flight: Optional[Flight] = None
+) -> Response:
+    """
+    Run a paginated service call and return the page items encoded as
+    `model`, with the next cursor as a header. A malformed cursor becomes
+    a 400. The items are encoded in one pass by dump_json rather than
+    through FastAPI's response_model handling.
+
+    With a `flight` key (see get_flight_key) and an ETag from
+    conditional_get, identical concurrent requests share one query and
+    one encoded body: only the request that leads calls `fetch`. The ETag
+    carries the user's version stamp, so a request made after a mutation
+    commits never joins a computation that started before it. A request
+    that joins another's computation gives its pool slot back while it
+    waits.
+    """
+    async def encode() -> Tuple[bytes, Optional[str]]:
+        try:
+            page = await fetch()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return dump_json(model, page.items), page.next_cursor
+
+    if flight and headers and "ETag" in headers:
+        body, next_cursor = await single_flight.do(
+            (flight.user_id, flight.url, headers["ETag"]), encode, lambda: db_released(flight.slot)
+        )
+    else:
+        body, next_cursor = await encode()
+
+    response = JSONBytesResponse(body, headers=headers)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def validate_batch(
+    items: List[Dict[str, Any]],
+    model: Type[BaseModel]
+) -> Tuple[List[int], List[BaseModel], Dict[int, str]]:
+    """
+    Validate each item of a batch body on its own, so one bad item is
+    reported against its index instead of failing the whole request.
+    Returns the indexes and models of the valid items plus an error
+    message per invalid index.
+    """
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Batch must contain at least one item"
+        )
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.BATCH_MAX_ITEMS} items"
+        )
+
+    indexes, valid, errors = [], [], {}
+    for index, item in enumerate(items):
+        try:
+            valid.append(model.model_validate(item))
+            indexes.append(index)
+        except ValidationError as e:
+            errors[index] = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+                for err in e.errors()
+            )
+    return indexes, valid, errors
+
 
+def check_batch_delete(ids: List[int]) -> None:
+    """Apply the BATCH_MAX_ITEMS cap to a batch delete body and reject repeated ids."""
+    if len(ids) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.BATCH_MAX_ITEMS} items"
+        )
+    repeated = sorted(item_id for item_id, count in Counter(ids).items() if count > 1)
+    if repeated:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Repeated ids: {', '.join(map(str, repeated))}"
+        )
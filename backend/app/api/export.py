@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.core.auth import get_current_user
+from app.core.database import db_pool
+from app.core.dependencies import acquire_db
+from app.services.export import EXPORT_MEDIA_TYPES, ExportService
+
+router = APIRouter()
+
+
+@router.get("/export")
+async def export(
+    resource: str = Query("deals", pattern="^(deals|payments|contracts)$"),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Download every deal, payment or contract of the current user as CSV,
+    NDJSON or Parquet. The file is streamed page by page as it is read.
+    """
+    user_id = user["user_id"]
+    
+    try:
+        writer = ExportService.create_writer(resource, format)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # The body is produced after the route returns, when yield dependencies
+    # have already exited, so the stream holds its own pool slot. It is
+    # released when the body finishes, or by the background task if the
+    # client goes away before the body starts.
+    db = await acquire_db()
+    released = False
+    
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            db_pool.release()
+    
+    async def body():
+        try:
+            async for chunk in ExportService.stream(db, user_id, resource, writer):
+                yield chunk
+        finally:
+            release()
+    
+    filename = f"{resource}-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(release)
+    )
@@ -0,0 +1,68 @@
+import logging
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+from app.api.deps import get_authenticated_user
+from app.core.database import PoolSlot
+from app.core.dependencies import db_released
+from app.models.imports import ImportResponse
+from app.services.imports import ImportReport, ImportService, parse_rows
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def _read_released(request: Request, slot: PoolSlot) -> AsyncIterator[bytes]:
+    """
+    The request body, read with the pool slot handed back while waiting
+    on the client, so only the chunk writes hold a slot.
+    """
+    chunks = request.stream()
+    while True:
+        async with db_released(slot):
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+        yield chunk
+
+
+@router.post("/import/{kind}", response_model=ImportResponse)
+async def import_rows(
+    request: Request,
+    kind: str = Path(..., pattern="^(deals|payments)$"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Import deals or payments from a CSV (with header row) or NDJSON request
+    body. The body is parsed as it arrives and written in chunks, so file
+    size is not limited by memory. Payment rows may name their deal with
+    `brandName` instead of `dealId`. Invalid rows are reported by row
+    number and do not stop the import. The request's pool slot is only
+    held while a chunk is written, not while the body is uploading.
+    """
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    def log_progress(report: ImportReport) -> None:
+        logger.info(
+            "Import of %s for user %s: %d processed, %d created, %d failed",
+            kind, user_id, report.processed, report.created, report.failed
+        )
+    
+    try:
+        report = await ImportService.run(
+            db,
+            user_id,
+            kind,
+            parse_rows(_read_released(request, deps["slot"]), format),
+            on_progress=log_progress
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return report
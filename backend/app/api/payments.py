@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from app.api.deps import get_authenticated_user
-from app.models.payment import PaymentCreate, PaymentUpdate, PaymentResponse
+from functools import partial
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query
+from app.api.deps import (
+    Flight, check_batch_delete, conditional_get, get_authenticated_user, get_flight_key,
+    get_page_params, paginate, sparse_fields, validate_batch
+)
+from app.core.serialization import narrow_model
+from app.models.payment import PaymentBatchUpdate, PaymentCreate, PaymentUpdate, PaymentResponse
+from app.models.batch import BatchDelete, BatchResponse, outcome_ids
 from app.services.payments import PaymentService
 from app.services.deals import DealService
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 router = APIRouter()
 
@@ -11,9 +17,16 @@ router = APIRouter()
 @router.get("/payments", response_model=List[PaymentResponse])
 async def get_payments(
     deal_id: Optional[int] = Query(None, alias="dealId"),
+    page: dict = Depends(get_page_params),
+    fields: tuple = Depends(sparse_fields(PaymentResponse)),
+    validators: dict = Depends(conditional_get("payments")),
+    flight: Flight = Depends(get_flight_key),
     deps: dict = Depends(get_authenticated_user)
 ):
-    """Get all payments for the current user, optionally filtered by deal."""
+    """
+    Get a page of payments for the current user, optionally filtered by
+    deal. `fields` limits each payment to the listed fields.
+    """
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
@@ -25,14 +38,18 @@ async def get_payments(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Deal not found"
             )
-        payments = await PaymentService.get_payments_by_deal(db, deal_id)
+        fetch = partial(PaymentService.get_payments_by_deal, db, deal_id, **page)
     else:
-        payments = await PaymentService.get_payments(db, user_id)
+        fetch = partial(PaymentService.get_payments, db, user_id, **page)
     
-    return payments
+    return await paginate(fetch, narrow_model(PaymentResponse, fields), validators, flight)
 
 
-@router.get("/payments/{payment_id}", response_model=PaymentResponse)
+@router.get(
+    "/payments/{payment_id}",
+    response_model=PaymentResponse,
+    dependencies=[Depends(conditional_get("payments"))]
+)
 async def get_payment(
     payment_id: int,
     deps: dict = Depends(get_authenticated_user)
@@ -41,21 +58,14 @@ async def get_payment(
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    payment = await PaymentService.get_payment(db, payment_id)
+    # Ownership is checked in the same query
+    payment = await PaymentService.get_payment(db, payment_id, user_id)
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Payment not found"
         )
     
-    # Verify the deal belongs to the user
-    deal = await DealService.get_deal(db, payment.dealId, user_id)
-    if not deal:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Unauthorized"
-        )
-    
     return payment
 
 
@@ -68,15 +78,14 @@ async def create_payment(
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    # Verify deal belongs to user
-    deal = await DealService.get_deal(db, payment_data.deal_id, user_id)
-    if not deal:
+    # Returns None if the deal doesn't belong to the user
+    payment = await PaymentService.create_payment(db, user_id, payment_data)
+    if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deal not found"
         )
     
-    payment = await PaymentService.create_payment(db, payment_data)
     return payment
 
 
@@ -90,23 +99,13 @@ async def update_payment(
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    # Get existing payment to verify ownership
-    existing = await PaymentService.get_payment(db, payment_id)
-    if not existing:
+    payment = await PaymentService.update_payment(db, payment_id, user_id, payment_data)
+    if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Payment not found"
         )
     
-    # Verify the deal belongs to the user
-    deal = await DealService.get_deal(db, existing.dealId, user_id)
-    if not deal:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Unauthorized"
-        )
-    
-    payment = await PaymentService.update_payment(db, payment_id, payment_data)
     return payment
 
 
@@ -119,23 +118,7 @@ async def delete_payment(
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    # Get existing payment to verify ownership
-    existing = await PaymentService.get_payment(db, payment_id)
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Payment not found"
-        )
-    
-    # Verify the deal belongs to the user
-    deal = await DealService.get_deal(db, existing.dealId, user_id)
-    if not deal:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Unauthorized"
-        )
-    
-    deleted = await PaymentService.delete_payment(db, payment_id)
+    deleted = await PaymentService.delete_payment(db, payment_id, user_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -144,3 +127,50 @@ async def delete_payment(
     
     return {"message": "Payment deleted successfully"}
 
+
+@router.post("/payments:batch", response_model=BatchResponse)
+async def create_payments_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Create several payments at once. Each item is validated on its own and
+    the valid ones are written in one transaction; the response has one
+    result per item, in order.
+    """
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    indexes, valid, errors = validate_batch(items, PaymentCreate)
+    rows = await PaymentService.create_payments(db, user_id, valid) if valid else []
+    return BatchResponse.build(len(items), errors, outcome_ids(indexes, rows), "Deal not found")
+
+
+@router.patch("/payments:batch", response_model=BatchResponse)
+async def update_payments_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Update several payments at once. Each item carries its `id` and the fields to change."""
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    indexes, valid, errors = validate_batch(items, PaymentBatchUpdate)
+    updates = [(item.id, item) for item in valid]
+    rows = await PaymentService.update_payments(db, user_id, updates) if updates else []
+    return BatchResponse.build(len(items), errors, outcome_ids(indexes, rows), "Payment not found")
+
+
+@router.post("/payments:batchDelete", response_model=BatchResponse)
+async def delete_payments_batch(
+    body: BatchDelete,
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Delete several payments at once."""
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    check_batch_delete(body.ids)
+    deleted = await PaymentService.delete_payments(db, user_id, body.ids)
+    outcomes = {index: item_id if ok else None for index, (item_id, ok) in enumerate(zip(body.ids, deleted))}
+    return BatchResponse.build(len(body.ids), {}, outcomes, "Payment not found")
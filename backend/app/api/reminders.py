@@ -1,21 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.deps import get_authenticated_user
-from app.models.reminder import ReminderCreate, ReminderUpdate, ReminderResponse
+from functools import partial
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from app.api.deps import (
+    Flight, check_batch_delete, conditional_get, get_authenticated_user, get_flight_key,
+    get_page_params, paginate, sparse_fields, validate_batch
+)
+from app.core.serialization import narrow_model
+from app.models.reminder import ReminderBatchUpdate, ReminderCreate, ReminderUpdate, ReminderResponse
+from app.models.batch import BatchDelete, BatchResponse, outcome_ids
 from app.services.reminders import ReminderService
 from app.services.deals import DealService
-from typing import List
+from typing import Any, Dict, List
 
 router = APIRouter()
 
 
 @router.get("/reminders", response_model=List[ReminderResponse])
-async def get_reminders(deps: dict = Depends(get_authenticated_user)):
-    """Get all reminders for the current user."""
+async def get_reminders(
+    page: dict = Depends(get_page_params),
+    fields: tuple = Depends(sparse_fields(ReminderResponse)),
+    validators: dict = Depends(conditional_get("reminders")),
+    flight: Flight = Depends(get_flight_key),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Get a page of reminders for the current user. `fields` limits each reminder to the listed fields."""
     user_id = deps["user"]["user_id"]
     db = deps["db"]
     
-    reminders = await ReminderService.get_reminders(db, user_id)
-    return reminders
+    return await paginate(
+        partial(ReminderService.get_reminders, db, user_id, **page),
+        narrow_model(ReminderResponse, fields),
+        validators,
+        flight
+    )
 
 
 @router.post("/reminders", response_model=ReminderResponse, status_code=status.HTTP_201_CREATED)
@@ -78,3 +94,50 @@ async def delete_reminder(
     
     return {"message": "Reminder deleted successfully"}
 
+
+@router.post("/reminders:batch", response_model=BatchResponse)
+async def create_reminders_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """
+    Create several reminders at once. Each item is validated on its own and
+    the valid ones are written in one transaction; the response has one
+    result per item, in order.
+    """
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    indexes, valid, errors = validate_batch(items, ReminderCreate)
+    rows = await ReminderService.create_reminders(db, user_id, valid) if valid else []
+    return BatchResponse.build(len(items), errors, outcome_ids(indexes, rows), "Deal not found")
+
+
+@router.patch("/reminders:batch", response_model=BatchResponse)
+async def update_reminders_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Update several reminders at once. Each item carries its `id` and the fields to change."""
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    indexes, valid, errors = validate_batch(items, ReminderBatchUpdate)
+    updates = [(item.id, item) for item in valid]
+    rows = await ReminderService.update_reminders(db, user_id, updates) if updates else []
+    return BatchResponse.build(len(items), errors, outcome_ids(indexes, rows), "Reminder not found")
+
+
+@router.post("/reminders:batchDelete", response_model=BatchResponse)
+async def delete_reminders_batch(
+    body: BatchDelete,
+    deps: dict = Depends(get_authenticated_user)
+):
+    """Delete several reminders at once."""
+    user_id = deps["user"]["user_id"]
+    db = deps["db"]
+    
+    check_batch_delete(body.ids)
+    deleted = await ReminderService.delete_reminders(db, user_id, body.ids)
+    outcomes = {index: item_id if ok else None for index, (item_id, ok) in enumerate(zip(body.ids, deleted))}
+    return BatchResponse.build(len(body.ids), {}, outcomes, "Reminder not found")
@@ -1,49 +1,183 @@
 from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import time
 from app.core.config import settings
+from app.core.metrics import metrics
 
 
 security = HTTPBearer()
 
 
+class TokenError(Exception):
+    """Raised by a JWT backend when a token cannot be verified."""
+
+
+class JoseBackend:
+    """HS256 verification with python-jose (the default)."""
+    
+    def decode(self, token: str, secret: str) -> dict:
+        try:
+            return jwt.decode(
+                token,
+                secret,
+                algorithms=["HS256"],
+                options={"verify_aud": False}  # Supabase doesn't use 'aud' claim
+            )
+        except JWTError as e:
+            raise TokenError(str(e))
+
+
+class PyJWTBackend:
+    """HS256 verification with PyJWT, which is noticeably faster than python-jose."""
+    
+    def __init__(self):
+        try:
+            import jwt as pyjwt
+        except ImportError:
+            raise RuntimeError("JWT_BACKEND=pyjwt requires the PyJWT package")
+        self._jwt = pyjwt
+    
+    def decode(self, token: str, secret: str) -> dict:
+        try:
+            return self._jwt.decode(
+                token,
+                secret,
+                algorithms=["HS256"],
+                options={"verify_aud": False}
+            )
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e))
+
+
+JWT_BACKENDS = {
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+}
+
+
+def get_jwt_backend(name: str):
+    """Instantiate the JWT backend configured by JWT_BACKEND."""
+    try:
+        return JWT_BACKENDS[name]()
+    except KeyError:
+        raise RuntimeError(
+            f"Unknown JWT_BACKEND '{name}', expected one of: {', '.join(JWT_BACKENDS)}"
+        )
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified user claims, keyed by a SHA-256 digest of
+    the raw token. An entry expires after `ttl` seconds or at the token's
+    `exp` claim, whichever comes first.
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        user, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+    
+    def set(self, token: str, user: dict) -> None:
+        if self.max_size <= 0:
+            return
+        
+        expires_at = time.time() + self.ttl
+        exp = user["claims"].get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        
+        key = self.key(token)
+        self._entries[key] = (user, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+jwt_backend = get_jwt_backend(settings.JWT_BACKEND)
+token_cache = TokenCache(
+    max_size=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL,
+)
+
+
 async def verify_token(credentials: HTTPAuthorizationCredentials) -> dict:
     """
     Verify Supabase JWT token and return user claims.
     Raises HTTPException if token is invalid.
+    Verified claims are cached until the token expires.
     """
     token = credentials.credentials
     
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    
     try:
         # Verify JWT token using Supabase JWT secret
-        payload = jwt.decode(
-            token,
-            settings.SUPABASE_JWT_SECRET,
-            algorithms=["HS256"],
-            options={"verify_aud": False}  # Supabase doesn't use 'aud' claim
-        )
-        
-        # Extract user ID from Supabase token
-        # Supabase tokens have 'sub' claim with user UUID
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: missing user ID"
-            )
-        
-        return {
-            "user_id": user_id,
-            "email": payload.get("email"),
-            "claims": payload
-        }
-        
-    except JWTError as e:
+        payload = jwt_backend.decode(token, settings.SUPABASE_JWT_SECRET)
+    except TokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid token: {str(e)}"
         )
+    
+    # Extract user ID from Supabase token
+    # Supabase tokens have 'sub' claim with user UUID
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: missing user ID"
+        )
+    
+    user = {
+        "user_id": user_id,
+        "email": payload.get("email"),
+        "claims": payload
+    }
+    token_cache.set(token, user)
+    return user
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = security) -> dict:
@@ -51,5 +185,5 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = security)
     Dependency to get current authenticated user.
     Use this in FastAPI route dependencies.
     """
-    return await verify_token(credentials)
-
+    with metrics.phase("auth"):
+        return await verify_token(credentials)
@@ -5,6 +5,9 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_DRAIN_TIMEOUT: float = 30.0
     
     # Supabase
     SUPABASE_URL: str
@@ -12,10 +15,63 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_ROLE_KEY: str
     SUPABASE_JWT_SECRET: str
     
+    # Contract storage: "supabase" or "local"
+    STORAGE_BACKEND: str = "supabase"
+    LOCAL_STORAGE_PATH: str = "./storage"
+    LOCAL_STORAGE_URL: str = "/storage"
+    STORAGE_TIMEOUT: float = 30.0
+    STORAGE_MAX_CONNECTIONS: int = 20
+    STORAGE_MAX_RETRIES: int = 3
+    STORAGE_RETRY_BACKOFF: float = 0.5
+    STORAGE_DELETE_WORKER: bool = True
+    STORAGE_DELETE_BATCH_SIZE: int = 100
+    STORAGE_DELETE_INTERVAL: float = 5.0
+    STORAGE_DELETE_RETRY_BASE: float = 30.0
+    
+    # Reminder dispatch
+    REMINDER_SCHEDULER: bool = True
+    REMINDER_NOTIFIER: str = "log"  # "log", "memory" or "webhook"
+    REMINDER_WEBHOOK_URL: Optional[str] = None
+    REMINDER_HORIZON: float = 600.0
+    REMINDER_BATCH_SIZE: int = 500
+    REMINDER_MAX_AGE: float = 86400.0
+    
+    # Auth
+    JWT_BACKEND: str = "jose"  # "jose" or "pyjwt"
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 300.0
+    
     # Server
     PORT: int = 8000
     ENVIRONMENT: str = "development"
     
+    # Pagination
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 500
+    
+    # Deal lookup cache (memory, redis or none)
+    DEAL_CACHE_BACKEND: str = "memory"
+    DEAL_CACHE_SIZE: int = 10000
+    DEAL_CACHE_TTL: float = 30.0
+    DEAL_CACHE_REDIS_URL: Optional[str] = None
+    
+    # Coalesced single-row lookups (rows per id IN (...) query)
+    LOADER_MAX_BATCH_SIZE: int = 500
+    
+    # Batch endpoints
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_TX_TIMEOUT: float = 60.0
+    
+    # Imports
+    IMPORT_CHUNK_SIZE: int = 500
+    
+    # Exports
+    EXPORT_PAGE_SIZE: int = 1000
+    
+    # Metrics (GET /metrics) and the X-Profile request profiler (needs pyinstrument)
+    METRICS_ENABLED: bool = True
+    PROFILER_ENABLED: bool = False
+    
     # CORS
     FRONTEND_URL: str = "http://localhost:3000"
     
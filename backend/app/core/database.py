@@ -0,0 +1,190 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from prisma import Prisma
+from app.core.config import settings
+
+
+def build_datasource_url(url: str, pool_size: int, pool_timeout: float) -> str:
+    """
+    Add Prisma connection pool parameters to a Postgres URL.
+
+    Values already present in the URL win, so an explicit
+    ``connection_limit`` in DATABASE_URL is never overridden.
+    """
+    parsed = urlparse(url)
+    params = dict(parse_qsl(parsed.query))
+    params.setdefault("connection_limit", str(pool_size))
+    params.setdefault("pool_timeout", str(int(pool_timeout)))
+    return urlunparse(parsed._replace(query=urlencode(params)))
+
+
+class PoolClosedError(RuntimeError):
+    """Raised when a request asks for the client while the pool is draining."""
+
+
+class DatabasePool:
+    """
+    Process-wide Prisma client shared by every request.
+
+    The query engine is connected once per worker and keeps its own Postgres
+    connection pool. Requests are admitted through a semaphore of the same
+    size, which makes time spent waiting for a connection measurable and lets
+    shutdown wait for in-flight requests before disconnecting.
+    """
+
+    def __init__(self, size: int, timeout: float):
+        self.size = size
+        self.timeout = timeout
+        self.client: Optional[Prisma] = None
+        self._slots = asyncio.Semaphore(size)
+        self._in_use = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+
+        # Wait-time metrics
+        self.acquired_total = 0
+        self.timeouts_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def connect(self) -> None:
+        """Connect the shared client. Safe to call more than once."""
+        if self.client is not None and self.client.is_connected():
+            return
+
+        self.client = Prisma(
+            datasource={
+                "url": build_datasource_url(
+                    settings.DATABASE_URL, self.size, self.timeout
+                )
+            }
+        )
+        await self.client.connect()
+        self._closing = False
+
+    async def disconnect(self, drain_timeout: float) -> None:
+        """
+        Stop admitting requests, wait up to ``drain_timeout`` seconds for
+        in-flight ones to finish, then disconnect the client.
+        """
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        if self.client is not None and self.client.is_connected():
+            await self.client.disconnect()
+        self.client = None
+
+    async def acquire(self) -> Prisma:
+        """
+        Take a pool slot and return the shared client. Every successful call
+        must be paired with release().
+
+        Raises PoolClosedError while draining and asyncio.TimeoutError if no
+        slot frees up within the configured timeout.
+        """
+        if self._closing or self.client is None:
+            raise PoolClosedError("Database pool is not accepting requests")
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts_total += 1
+            raise
+
+        waited = time.perf_counter() - started
+        self.acquired_total += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        self._in_use += 1
+        self._idle.clear()
+        return self.client
+
+    def release(self) -> None:
+        """Give back a slot taken by acquire()."""
+        self._in_use -= 1
+        if self._in_use == 0:
+            self._idle.set()
+        self._slots.release()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Prisma]:
+        """Hold a pool slot for the duration of the block."""
+        db = await self.acquire()
+        try:
+            yield db
+        finally:
+            self.release()
+
+    def slot(self) -> "PoolSlot":
+        """A request's handle on one slot of this pool, not yet taken."""
+        return PoolSlot(self)
+
+    async def health_check(self) -> bool:
+        """Run a trivial query against the database."""
+        if self.client is None or not self.client.is_connected():
+            return False
+        try:
+            await self.client.query_raw("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage and wait-time metrics."""
+        return {
+            "size": self.size,
+            "in_use": self._in_use,
+            "acquired_total": self.acquired_total,
+            "timeouts_total": self.timeouts_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(
+                self.wait_seconds_total / self.acquired_total, 6
+            ) if self.acquired_total else 0.0,
+        }
+
+
+class PoolSlot:
+    """
+    One request's hold on a pool slot. It tracks whether the slot is
+    currently taken, so a request can give the slot back while it waits
+    on something other than the database (a client upload, another
+    request's query) and take one again afterwards, and the final
+    release() is still paired with exactly one acquire().
+    """
+    __slots__ = ("pool", "held")
+
+    def __init__(self, pool: DatabasePool):
+        self.pool = pool
+        self.held = False
+
+    async def acquire(self) -> Prisma:
+        """Take a slot if not already holding one, with DatabasePool.acquire's errors."""
+        if self.held:
+            return self.pool.client
+        db = await self.pool.acquire()
+        self.held = True
+        return db
+
+    def release(self) -> None:
+        """Give the slot back if holding one."""
+        if self.held:
+            self.held = False
+            self.pool.release()
+
+
+# Global instance
+db_pool = DatabasePool(
+    size=settings.DB_POOL_SIZE,
+    timeout=settings.DB_POOL_TIMEOUT,
+)
@@ -1,16 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import HTTPException, Request, status
 from prisma import Prisma
-from typing import Generator
+from typing import AsyncGenerator, AsyncIterator, Iterator
+from app.core.database import db_pool, PoolClosedError, PoolSlot
 
 
-def get_db() -> Generator:
+@contextmanager
+def _unavailable_on_pool_error() -> Iterator[None]:
+    """Turn a pool timeout or shutdown into a 503."""
+    try:
+        yield
+    except (asyncio.TimeoutError, PoolClosedError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable"
+        )
+
+
+async def acquire_db() -> Prisma:
+    """
+    Take a pool slot, turning a pool timeout or shutdown into a 503.
+    The caller must call db_pool.release() when done.
+    """
+    with _unavailable_on_pool_error():
+        return await db_pool.acquire()
+
+
+async def get_db(request: Request) -> AsyncGenerator[Prisma, None]:
     """
     Database dependency for FastAPI routes.
-    Yields Prisma client instance.
+    Yields the process-wide Prisma client, holding a pool slot
+    until the request finishes. The slot is kept on
+    request.state.db_slot so the route can hand it back with
+    db_released() while it waits on something else.
     """
-    db = Prisma()
+    slot = db_pool.slot()
+    with _unavailable_on_pool_error():
+        db = await slot.acquire()
+    request.state.db_slot = slot
     try:
-        db.connect()
         yield db
     finally:
-        db.disconnect()
+        slot.release()
+
 
+@asynccontextmanager
+async def db_released(slot: PoolSlot) -> AsyncIterator[None]:
+    """
+    Give a request's pool slot back for the duration of the block and
+    take one again after it. Use it around waits that do not touch the
+    database, such as reading the request body or uploading to storage,
+    so a slow client does not keep other requests out of the pool.
+    """
+    slot.release()
+    try:
+        yield
+    finally:
+        with _unavailable_on_pool_error():
+            await slot.acquire()
@@ -0,0 +1,321 @@
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds of the request latency histogram, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Time spent in these phases is recorded per route
+PHASES = ("db", "auth", "serialize")
+
+# Requests sent with this header are profiled when PROFILER_ENABLED is set
+PROFILE_HEADER = b"x-profile"
+
+
+class RequestTimings:
+    """Query count and per-phase time of the request being handled."""
+    __slots__ = ("db_queries", "seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+
+class RouteStats:
+    """Running totals for one (method, route template)."""
+    __slots__ = ("buckets", "latency_sum", "statuses", "db_queries", "seconds")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.db_queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+# (bucket upper bounds, per-bucket counts with +Inf last, sum of observations)
+Histogram = Tuple[Sequence[float], Sequence[int], float]
+
+
+def _histogram_lines(metric: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+    """Cumulative _bucket series plus _sum and _count for one label set."""
+    bounds, counts, total = histogram
+    lines = []
+    cumulative = 0
+    for bound, count in zip(tuple(bounds) + ("+Inf",), counts):
+        cumulative += count
+        lines.append(f"{metric}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{metric}_sum{_labels(**labels)} {total}")
+    lines.append(f"{metric}_count{_labels(**labels)} {cumulative}")
+    return lines
+
+
+class Metrics:
+    """
+    In-process request metrics, rendered in the Prometheus text format by
+    GET /metrics. MetricsMiddleware times each request and files it under
+    its route template; code on the hot path adds to the current request
+    through phase() and the instrumented Prisma engine. Recording is a few
+    perf_counter calls and dict updates per request, cheap enough to leave on.
+
+    Other components are exposed as gauges by registering their stats()
+    callables; their numeric values are exported as-is.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        # Every query, including those of background workers
+        self.db_queries_total = 0
+        self.db_seconds_total = 0.0
+        self._stats: List[Tuple[str, Callable[[], dict], Optional[str]]] = []
+        self._histograms: List[Tuple[str, str, Callable[[], Dict[str, Histogram]], str]] = []
+
+    def register_stats(self, name: str, stats: Callable[[], dict], label: Optional[str] = None) -> None:
+        """
+        Export `stats()` as dealflow_<name>_<key> gauges. With `label`,
+        stats() returns {label value: stats dict} instead.
+        """
+        self._stats.append((name, stats, label))
+
+    def register_histogram(
+        self,
+        name: str,
+        help_text: str,
+        histograms: Callable[[], Dict[str, Histogram]],
+        label: str
+    ) -> None:
+        """
+        Export a dealflow_<name> histogram. `histograms()` returns
+        {label value: (bounds, per-bucket counts, sum)}.
+        """
+        self._histograms.append((name, help_text, histograms, label))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the time spent in the block to the current request's `name` phase."""
+        timings = _current.get()
+        if timings is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.seconds[name] += time.perf_counter() - started
+
+    def record_query(self, seconds: float) -> None:
+        self.db_queries_total += 1
+        self.db_seconds_total += seconds
+        timings = _current.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.seconds["db"] += seconds
+
+    def instrument_prisma(self, client: Prisma) -> None:
+        """
+        Time every query sent through the client's query engine. The engine
+        is shared with the client's transaction copies, so queries inside
+        db.tx() are counted too. engine.query is private to prisma-client-py;
+        tests/test_metrics.py pins its signature.
+        """
+        engine = client._engine
+        if getattr(engine, "_untimed_query", None) is not None:
+            return
+        query = engine.query
+
+        async def timed_query(content: str, *, tx_id=None):
+            started = time.perf_counter()
+            try:
+                return await query(content, tx_id=tx_id)
+            finally:
+                self.record_query(time.perf_counter() - started)
+
+        engine._untimed_query = query
+        engine.query = timed_query
+
+    def observe_request(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        seconds: float,
+        timings: RequestTimings
+    ) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.latency_sum += seconds
+        stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+        stats.db_queries += timings.db_queries
+        for phase, spent in timings.seconds.items():
+            stats.seconds[phase] += spent
+
+    def render(self) -> str:
+        lines = [
+            "# HELP dealflow_request_duration_seconds Request latency by route.",
+            "# TYPE dealflow_request_duration_seconds histogram",
+        ]
+        routes = sorted(self.routes.items())
+        for (method, route), stats in routes:
+            lines += _histogram_lines(
+                "dealflow_request_duration_seconds",
+                {"method": method, "route": route},
+                (LATENCY_BUCKETS, stats.buckets, stats.latency_sum)
+            )
+
+        lines += [
+            "# HELP dealflow_requests_total Requests by route and status.",
+            "# TYPE dealflow_requests_total counter",
+        ]
+        for (method, route), stats in routes:
+            for status_code, count in sorted(stats.statuses.items()):
+                labels = _labels(method=method, route=route, status=status_code)
+                lines.append(f"dealflow_requests_total{labels} {count}")
+
+        lines += [
+            "# HELP dealflow_request_db_queries_total Database queries issued by requests, by route.",
+            "# TYPE dealflow_request_db_queries_total counter",
+        ]
+        for (method, route), stats in routes:
+            lines.append(f"dealflow_request_db_queries_total{_labels(method=method, route=route)} {stats.db_queries}")
+
+        lines += [
+            "# HELP dealflow_request_phase_seconds_total Time requests spent in the database, auth and serialization.",
+            "# TYPE dealflow_request_phase_seconds_total counter",
+        ]
+        for (method, route), stats in routes:
+            for phase, spent in stats.seconds.items():
+                labels = _labels(method=method, route=route, phase=phase)
+                lines.append(f"dealflow_request_phase_seconds_total{labels} {spent}")
+
+        lines += [
+            "# HELP dealflow_db_queries_total Database queries, including background workers.",
+            "# TYPE dealflow_db_queries_total counter",
+            f"dealflow_db_queries_total {self.db_queries_total}",
+            "# HELP dealflow_db_query_seconds_total Time spent in database queries.",
+            "# TYPE dealflow_db_query_seconds_total counter",
+            f"dealflow_db_query_seconds_total {self.db_seconds_total}",
+        ]
+
+        for name, help_text, histograms, label in self._histograms:
+            metric = f"dealflow_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+            for label_value, histogram in sorted(histograms().items()):
+                lines += _histogram_lines(metric, {label: label_value}, histogram)
+
+        for name, stats, label in self._stats:
+            groups = stats().items() if label else [(None, stats())]
+            # metric -> samples, so each metric gets a single TYPE line
+            series: Dict[str, List[str]] = {}
+            for label_value, values in groups:
+                labels = _labels(**{label: label_value}) if label else ""
+                for key, value in values.items():
+                    if isinstance(value, bool):
+                        value = int(value)
+                    if not isinstance(value, (int, float)):
+                        continue
+                    series.setdefault(f"dealflow_{name}_{key}", []).append(f"{labels} {value}")
+            for metric, samples in series.items():
+                lines.append(f"# TYPE {metric} untyped")
+                lines.extend(metric + sample for sample in samples)
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times each HTTP request and records it against
+    its route template (e.g. /api/v1/deals/{deal_id}), so ids in the path
+    do not create new series. Requests that match no route are filed
+    under "other".
+
+    With `profiler` on, a request carrying an X-Profile header is run
+    under pyinstrument's sampling profiler and the report is logged. One
+    request is profiled at a time; others go through unprofiled.
+    """
+
+    def __init__(self, app, metrics: "Metrics", profiler: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.profiler_class = None
+        self._profiling = False
+        if profiler:
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise RuntimeError("PROFILER_ENABLED requires the pyinstrument package")
+            self.profiler_class = Profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler = self._start_profiler(scope)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "other"
+            self.metrics.observe_request(scope["method"], route, status_code, elapsed, timings)
+            if profiler is not None:
+                self._finish_profiler(profiler, scope["method"], scope["path"], elapsed)
+
+    def _start_profiler(self, scope):
+        if self.profiler_class is None or self._profiling:
+            return None
+        if not any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            return None
+        profiler = self.profiler_class(async_mode="enabled")
+        try:
+            profiler.start()
+        except Exception:
+            logger.warning("Could not start the profiler", exc_info=True)
+            return None
+        self._profiling = True
+        return profiler
+
+    def _finish_profiler(self, profiler, method: str, path: str, elapsed: float) -> None:
+        try:
+            profiler.stop()
+            logger.info(
+                "Profile of %s %s (%.1f ms)\n%s",
+                method, path, elapsed * 1000, profiler.output_text(unicode=False, color=False)
+            )
+        finally:
+            self._profiling = False
+
+
+# Global instance
+metrics = Metrics()
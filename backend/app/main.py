@@ -1,14 +1,47 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+from app.core.auth import token_cache
 from app.core.config import settings
-from app.api import deals, payments, contracts, reminders
+from app.core.database import db_pool
+from app.core.metrics import MetricsMiddleware, metrics
+from app.services.storage import storage_service
+from app.services.storage_queue import storage_deletion_worker
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.cache import deal_cache
+from app.services.loaders import loader_histograms, loader_stats
+from app.api.deps import NEXT_CURSOR_HEADER, conditional_stats, single_flight
+from app.api import deals, payments, contracts, reminders, dashboard, imports, export
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Prisma client per worker process, shared by all requests
+    await db_pool.connect()
+    if settings.METRICS_ENABLED:
+        metrics.instrument_prisma(db_pool.client)
+    if settings.STORAGE_DELETE_WORKER:
+        storage_deletion_worker.start()
+    if settings.REMINDER_SCHEDULER:
+        reminder_scheduler.start()
+    try:
+        yield
+    finally:
+        await reminder_scheduler.stop()
+        await storage_deletion_worker.stop()
+        await db_pool.disconnect(drain_timeout=settings.DB_DRAIN_TIMEOUT)
+        await storage_service.aclose()
+
 
 app = FastAPI(
     title="DealFlow API",
     description="Brand Deal CRM API for Creators",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,13 +51,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
+# Request metrics, exported by GET /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=metrics, profiler=settings.PROFILER_ENABLED)
+    metrics.register_stats("pool", db_pool.stats)
+    metrics.register_stats("auth_cache", token_cache.stats)
+    metrics.register_stats("conditional_get", conditional_stats.stats)
+    metrics.register_stats("single_flight", single_flight.stats)
+    metrics.register_stats("loader", loader_stats, label="loader")
+    metrics.register_histogram(
+        "loader_batch_size", "Ids per batched lookup query.", loader_histograms, label="loader"
+    )
+    if deal_cache:
+        metrics.register_stats("deal_cache", deal_cache.stats)
+
 # Include routers
 app.include_router(deals.router, prefix="/api/v1", tags=["deals"])
 app.include_router(payments.router, prefix="/api/v1", tags=["payments"])
 app.include_router(contracts.router, prefix="/api/v1", tags=["contracts"])
 app.include_router(reminders.router, prefix="/api/v1", tags=["reminders"])
+app.include_router(dashboard.router, prefix="/api/v1", tags=["dashboard"])
+app.include_router(imports.router, prefix="/api/v1", tags=["import"])
+app.include_router(export.router, prefix="/api/v1", tags=["export"])
+
+# Serve uploaded contracts when using the local storage backend
+if settings.STORAGE_BACKEND == "local":
+    app.mount(
+        settings.LOCAL_STORAGE_URL,
+        StaticFiles(directory=settings.LOCAL_STORAGE_PATH, check_dir=False),
+        name="storage"
+    )
 
 
 @app.get("/")
@@ -38,7 +97,25 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    database_ok = await db_pool.health_check()
+    return {
+        "status": "healthy" if database_ok else "degraded",
+        "database": database_ok,
+        "pool": db_pool.stats(),
+        "conditional_get": conditional_stats.stats(),
+        "single_flight": single_flight.stats(),
+        "deal_cache": deal_cache.stats() if deal_cache else None,
+        "loaders": loader_stats()
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, database, cache and pool metrics."""
+    return PlainTextResponse(
+        metrics.render() if settings.METRICS_ENABLED else "",
+        media_type="text/plain; version=0.0.4"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Sequence
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+    
+    @classmethod
+    def build(
+        cls,
+        total: int,
+        errors: Dict[int, str],
+        outcomes: Dict[int, Optional[int]],
+        missing: str
+    ) -> "BatchResponse":
+        """
+        Combine validation errors and write outcomes into one result per
+        submitted item, in submission order. An outcome of None means the
+        row was not found for this user and is reported with `missing`.
+        """
+        results = []
+        for index in range(total):
+            if index in errors:
+                results.append(BatchItemResult(index=index, ok=False, error=errors[index]))
+            elif outcomes.get(index) is None:
+                results.append(BatchItemResult(index=index, ok=False, error=missing))
+            else:
+                results.append(BatchItemResult(index=index, id=outcomes[index], ok=True))
+        
+        succeeded = sum(1 for result in results if result.ok)
+        return cls(succeeded=succeeded, failed=total - succeeded, results=results)
+
+
+class BatchDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+def outcome_ids(indexes: Sequence[int], rows: Sequence) -> Dict[int, Optional[int]]:
+    """Map submission indexes to the ids of the rows written for them."""
+    return {index: row.id if row else None for index, row in zip(indexes, rows)}
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field
+from typing import List
+from decimal import Decimal
+
+
+class StatusTotal(BaseModel):
+    status: str
+    count: int
+    total_value: Decimal = Field(alias="totalValue")
+    
+    class Config:
+        populate_by_name = True
+
+
+class PlatformRevenue(BaseModel):
+    platform: str
+    revenue: Decimal
+    
+    class Config:
+        populate_by_name = True
+
+
+class PaymentTotals(BaseModel):
+    paid: Decimal
+    outstanding: Decimal
+    paid_count: int = Field(alias="paidCount")
+    outstanding_count: int = Field(alias="outstandingCount")
+    
+    class Config:
+        populate_by_name = True
+
+
+class ReminderCounts(BaseModel):
+    upcoming: int
+    pending: int
+
+
+class DashboardSummary(BaseModel):
+    pipeline: List[StatusTotal]
+    revenue_by_platform: List[PlatformRevenue] = Field(alias="revenueByPlatform")
+    payments: PaymentTotals
+    reminders: ReminderCounts
+    
+    class Config:
+        populate_by_name = True
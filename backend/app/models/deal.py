@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
+from app.models.contract import ContractResponse
+from app.models.payment import PaymentResponse
+from app.models.reminder import ReminderResponse
 
 
 class DealBase(BaseModel):
@@ -69,6 +72,10 @@ class DealUpdate(BaseModel):
         return v
 
 
+class DealBatchUpdate(DealUpdate):
+    id: int
+
+
 class DealResponse(BaseModel):
     id: int
     user_id: str = Field(alias="userId")
@@ -84,3 +91,9 @@ class DealResponse(BaseModel):
         from_attributes = True
         populate_by_name = True
 
+
+class DealDetailResponse(DealResponse):
+    """A deal with the related collections asked for in `include`; the others are null."""
+    payments: Optional[List[PaymentResponse]] = None
+    contracts: Optional[List[ContractResponse]] = None
+    reminders: Optional[List[ReminderResponse]] = None
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportResponse(BaseModel):
+    kind: str
+    processed: int
+    created: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = Field(alias="errorsTruncated")
+    
+    class Config:
+        from_attributes = True
+        populate_by_name = True
@@ -43,6 +43,10 @@ class PaymentUpdate(BaseModel):
         return v
 
 
+class PaymentBatchUpdate(PaymentUpdate):
+    id: int
+
+
 class PaymentResponse(BaseModel):
     id: int
     deal_id: int = Field(alias="dealId")
@@ -39,6 +39,10 @@ class ReminderUpdate(BaseModel):
         return v
 
 
+class ReminderBatchUpdate(ReminderUpdate):
+    id: int
+
+
 class ReminderResponse(BaseModel):
     id: int
     user_id: str = Field(alias="userId")
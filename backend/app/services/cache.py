@@ -0,0 +1,182 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from prisma.models import Deal
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """Per-process LRU cache with a fixed TTL per entry."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "evictions": self.evictions,
+        }
+
+
+class RedisCacheBackend:
+    """
+    Cache shared by every API process. `client` is anything with async
+    get(key), set(key, value, ex=seconds) and delete(key), normally a
+    redis.asyncio client; a dict-backed stand-in works for tests. Values are
+    stored with the dumps/loads pair given, and size and LRU eviction are
+    left to the server's maxmemory policy.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: float,
+        dumps: Callable[[Any], str],
+        loads: Callable[[str], Any],
+        prefix: str = "dealflow:"
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.prefix = prefix
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self.client.get(self.prefix + key)
+        except Exception:
+            # A cache outage should only cost the lookup it saved
+            logger.warning("Shared cache get failed", exc_info=True)
+            self.errors += 1
+            return None
+        return None if raw is None else self.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        try:
+            await self.client.set(self.prefix + key, self.dumps(value), ex=max(int(self.ttl), 1))
+        except Exception:
+            logger.warning("Shared cache set failed", exc_info=True)
+            self.errors += 1
+
+    async def delete(self, key: str) -> None:
+        # Not swallowed: a failed invalidation would leave stale data for the TTL
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"errors": self.errors}
+
+
+class ReadThroughCache:
+    """
+    Read-through wrapper over a cache backend. Misses call the loader and
+    store non-None results. An invalidation that lands while a load is in
+    flight stops that load from being stored, so a row read just before a
+    write cannot be cached after the write's invalidation.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._invalidations = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        generation = self._invalidations
+        value = await loader()
+        if value is not None and generation == self._invalidations:
+            await self.backend.set(key, value)
+        return value
+
+    async def invalidate(self, key: str) -> None:
+        self._invalidations += 1
+        await self.backend.delete(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            **self.backend.stats(),
+        }
+
+
+def deal_cache_key(user_id: str, deal_id: int) -> str:
+    return f"deal:{user_id}:{deal_id}"
+
+
+def create_deal_cache(backend: Optional[str] = None) -> Optional[ReadThroughCache]:
+    """Build the deal cache selected by DEAL_CACHE_BACKEND, or None when disabled."""
+    backend = backend or settings.DEAL_CACHE_BACKEND
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return ReadThroughCache(
+            MemoryCacheBackend(settings.DEAL_CACHE_SIZE, settings.DEAL_CACHE_TTL)
+        )
+    if backend == "redis":
+        if not settings.DEAL_CACHE_REDIS_URL:
+            raise RuntimeError("DEAL_CACHE_BACKEND=redis requires DEAL_CACHE_REDIS_URL")
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("DEAL_CACHE_BACKEND=redis requires the redis package")
+        return ReadThroughCache(RedisCacheBackend(
+            redis.from_url(settings.DEAL_CACHE_REDIS_URL),
+            ttl=settings.DEAL_CACHE_TTL,
+            dumps=lambda deal: deal.model_dump_json(),
+            loads=Deal.model_validate_json,
+        ))
+    raise RuntimeError(
+        f"Unknown DEAL_CACHE_BACKEND '{backend}', expected 'memory', 'redis' or 'none'"
+    )
+
+
+# Global instance
+deal_cache = create_deal_cache()
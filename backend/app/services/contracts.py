@@ -1,47 +1,73 @@
 from prisma import Prisma
 from app.models.contract import ContractCreate, ContractUpdate
-from typing import List, Optional
+from app.services.loaders import contract_loader
+from app.services.pagination import (
+    Page, build_page, keyset_order, keyset_take, keyset_where
+)
+from typing import Optional
 from prisma.models import Contract
 
 
+# Delete an owned contract and queue its file for the storage deletion
+# worker (see app.services.storage_queue) in one statement
+DELETE_CONTRACT_SQL = """
+    WITH gone AS (
+        DELETE FROM contracts c
+        USING deals d
+        WHERE c.id = $1 AND d.id = c.deal_id AND d.user_id = $2
+        RETURNING c.file_url
+    )
+    INSERT INTO storage_deletions (file_url, next_attempt_at, created_at)
+    SELECT file_url, timezone('utc', now()), timezone('utc', now()) FROM gone
+"""
+
+
 class ContractService:
     @staticmethod
-    async def get_contracts(db: Prisma, user_id: str) -> List[Contract]:
-        """Get all contracts for deals belonging to a user."""
-        # Get all user's deals first
-        user_deals = await db.deal.find_many(
-            where={"userId": user_id},
-            select={"id": True}
+    async def get_contracts(
+        db: Prisma,
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Page[Contract]:
+        """Get a page of contracts for deals belonging to a user."""
+        # Filter through the deal relation so this is a single query
+        rows = await db.contract.find_many(
+            where={
+                "deal": {"is": {"userId": user_id}},
+                **keyset_where("createdAt", cursor)
+            },
+            order=keyset_order("createdAt"),
+            take=keyset_take(limit)
         )
-        deal_ids = [deal.id for deal in user_deals]
-        
-        if not deal_ids:
-            return []
-        
-        # Get contracts for all user's deals
-        # Note: Prisma Python "in" syntax may need adjustment
-        # Alternative: Loop through deals and collect contracts
-        all_contracts = []
-        for deal_id in deal_ids:
-            contracts = await db.contract.find_many(
-                where={"dealId": deal_id},
-                order=[{"createdAt": "desc"}]
-            )
-            all_contracts.extend(contracts)
-        return sorted(all_contracts, key=lambda c: c.createdAt, reverse=True)
+        return build_page(rows, limit, "createdAt")
     
     @staticmethod
-    async def get_contracts_by_deal(db: Prisma, deal_id: int) -> List[Contract]:
-        """Get all contracts for a specific deal."""
-        return await db.contract.find_many(
-            where={"dealId": deal_id},
-            order=[{"createdAt": "desc"}]
+    async def get_contracts_by_deal(
+        db: Prisma,
+        deal_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Page[Contract]:
+        """Get a page of contracts for a specific deal."""
+        rows = await db.contract.find_many(
+            where={"dealId": deal_id, **keyset_where("createdAt", cursor)},
+            order=keyset_order("createdAt"),
+            take=keyset_take(limit)
         )
+        return build_page(rows, limit, "createdAt")
     
     @staticmethod
-    async def get_contract(db: Prisma, contract_id: int) -> Optional[Contract]:
-        """Get a single contract by ID."""
-        return await db.contract.find_unique(where={"id": contract_id})
+    async def get_contract(
+        db: Prisma,
+        contract_id: int,
+        user_id: str
+    ) -> Optional[Contract]:
+        """
+        Get a single contract by ID, ensuring its deal belongs to the user.
+        Batched with concurrent lookups by contract_loader.
+        """
+        return await contract_loader.load(db, user_id, contract_id)
     
     @staticmethod
     async def create_contract(db: Prisma, contract_data: ContractCreate) -> Contract:
@@ -63,12 +89,11 @@ class ContractService:
         )
     
     @staticmethod
-    async def delete_contract(db: Prisma, contract_id: int) -> bool:
-        """Delete a contract."""
-        contract = await db.contract.find_unique(where={"id": contract_id})
-        if not contract:
-            return False
-        
-        await db.contract.delete(where={"id": contract_id})
-        return True
+    async def delete_contract(db: Prisma, contract_id: int, user_id: str) -> bool:
+        """
+        Delete a contract, ensuring its deal belongs to the user.
+        The stored file is removed later by the storage deletion worker.
+        """
+        deleted = await db.execute_raw(DELETE_CONTRACT_SQL, contract_id, user_id)
+        return deleted > 0
 
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+from prisma import Prisma
+from prisma.enums import Platform
+from app.services.rollups import RollupService
+
+
+PLATFORM_REVENUE_SQL = """
+    SELECT d.platform::text AS platform,
+           COALESCE(SUM(p.amount), 0)::text AS revenue
+    FROM payments p
+    JOIN deals d ON d.id = p.deal_id
+    WHERE d.user_id = $1 AND p.paid
+    GROUP BY d.platform
+"""
+
+
+def _decimal(value: Optional[str]) -> Decimal:
+    # Sums are selected as text so no precision is lost on the way through the engine
+    return Decimal(value) if value is not None else Decimal("0")
+
+
+class DashboardService:
+    @staticmethod
+    async def get_summary(db: Prisma, user_id: str, days: int = 7) -> dict:
+        """
+        Build the dashboard figures for a user. Pipeline and payment totals
+        come from the precomputed rollups; revenue by platform is aggregated
+        in the database. Every DealStatus and Platform is present in the
+        result, with zero totals where the user has no rows.
+        """
+        now = datetime.now(timezone.utc)
+        rollups, platform_rows, upcoming, pending = await asyncio.gather(
+            RollupService.get_rollups(db, user_id),
+            db.query_raw(PLATFORM_REVENUE_SQL, user_id),
+            db.reminder.count(
+                where={
+                    "userId": user_id,
+                    "sent": False,
+                    "remindAt": {"gt": now, "lte": now + timedelta(days=days)}
+                }
+            ),
+            db.reminder.count(where={"userId": user_id, "sent": False}),
+        )
+        
+        by_platform = {row["platform"]: row["revenue"] for row in platform_rows}
+        revenue_by_platform = [
+            {
+                "platform": platform.value,
+                "revenue": _decimal(by_platform.get(platform.value)),
+            }
+            for platform in Platform
+        ]
+        
+        return {
+            "pipeline": rollups["pipeline"],
+            "revenueByPlatform": revenue_by_platform,
+            "payments": rollups["payments"],
+            "reminders": {"upcoming": upcoming, "pending": pending},
+        }
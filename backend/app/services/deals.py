@@ -1,21 +1,174 @@
 from prisma import Prisma
 from app.models.deal import DealCreate, DealUpdate
-from typing import List, Optional
+from app.services.rollups import RollupDeltas, RollupService
+from app.services.storage_queue import StorageDeletionQueue
+from app.services.versions import VersionService
+from app.services.cache import deal_cache, deal_cache_key
+from app.services.loaders import deal_loader
+from app.services.pagination import (
+    Page, build_page, decode_cursor, encode_cursor, keyset_order, keyset_take, keyset_where
+)
+from app.core.config import settings
+from typing import List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from prisma.enums import DealStatus, Platform
 from prisma.models import Deal
+from prisma.actions import DealActions
+from prisma.partials import DealWithoutNotes
+
+
+BATCH_TX_TIMEOUT = timedelta(seconds=settings.BATCH_TX_TIMEOUT)
+
+# Sortable fields for GET /deals: (cursor value type, nullable)
+SORT_FIELDS = {
+    "createdAt": (datetime, False),
+    "deadline": (datetime, True),
+    "dealValue": (Decimal, False),
+}
+
+# Related collections a deal can be read with, and the order each is listed in
+DEAL_RELATIONS = {
+    "payments": keyset_order("createdAt"),
+    "contracts": keyset_order("createdAt"),
+    "reminders": keyset_order("remindAt"),
+}
+
+# Ranked deal search, served by the trigram indexes on brand_name and notes.
+# Brand prefix matches rank above brand substring matches, which rank above
+# notes matches; trigram similarity to the brand breaks ties and also admits
+# misspelt brands. Pages are keyset on (rank, id).
+SEARCH_DEALS_SQL = """
+    SELECT * FROM (
+        SELECT d.id,
+               d.user_id AS "userId",
+               d.brand_name AS "brandName",
+               d.platform::text AS platform,
+               d.deal_value::text AS "dealValue",
+               d.status::text AS status,
+               d.deadline,
+               d.notes,
+               d.created_at AS "createdAt",
+               (CASE
+                    WHEN d.brand_name ILIKE $3 THEN 3
+                    WHEN d.brand_name ILIKE $4 THEN 2
+                    WHEN d.notes ILIKE $4 THEN 1
+                    ELSE 0
+                END + similarity(d.brand_name, $2))::float8 AS rank
+        FROM deals d
+        WHERE d.user_id = $1
+          AND (d.brand_name ILIKE $4 OR d.notes ILIKE $4 OR d.brand_name % $2)
+    ) s
+    WHERE $5::float8 IS NULL OR (s.rank, s.id) < ($5::float8, $6::int)
+    ORDER BY s.rank DESC, s.id DESC
+    LIMIT $7
+"""
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class DealService:
     @staticmethod
-    async def get_deals(db: Prisma, user_id: str) -> List[Deal]:
-        """Get all deals for a user."""
-        return await db.deal.find_many(
-            where={"userId": user_id},
-            order=[{"createdAt": "desc"}]
+    def filter_where(filters: dict) -> dict:
+        """Prisma where-clause fragment for the GET /deals filters."""
+        where = {}
+        if filters.get("status"):
+            where["status"] = DealStatus(filters["status"])
+        if filters.get("platform"):
+            where["platform"] = Platform(filters["platform"])
+        
+        deadline = {}
+        if filters.get("deadline_from") is not None:
+            deadline["gte"] = filters["deadline_from"]
+        if filters.get("deadline_to") is not None:
+            deadline["lte"] = filters["deadline_to"]
+        if deadline:
+            where["deadline"] = deadline
+        
+        value = {}
+        if filters.get("min_value") is not None:
+            value["gte"] = filters["min_value"]
+        if filters.get("max_value") is not None:
+            value["lte"] = filters["max_value"]
+        if value:
+            where["dealValue"] = value
+        return where
+    
+    @staticmethod
+    async def get_deals(
+        db: Prisma,
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        filters: Optional[dict] = None,
+        sort: str = "createdAt",
+        order: str = "desc",
+        include: Sequence[str] = (),
+        fields: Sequence[str] = ()
+    ) -> Page[Deal]:
+        """Get a page of deals for a user, with optional filters, sort, relations and fields."""
+        value_type, nullable = SORT_FIELDS[sort]
+        actions = db.deal
+        if fields and "notes" not in fields:
+            # Partial .prisma() is bound to the registered client, so build the actions here
+            actions = DealActions(db, DealWithoutNotes)
+        rows = await actions.find_many(
+            where={
+                "userId": user_id,
+                **DealService.filter_where(filters or {}),
+                **keyset_where(sort, cursor, order, value_type, nullable)
+            },
+            order=keyset_order(sort, order),
+            take=keyset_take(limit),
+            include=DealService.include_arg(include)
         )
+        return build_page(rows, limit, sort, order)
     
     @staticmethod
-    async def get_deal(db: Prisma, deal_id: int, user_id: str) -> Optional[Deal]:
-        """Get a single deal by ID, ensuring it belongs to the user."""
+    async def search_deals(
+        db: Prisma,
+        user_id: str,
+        query: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Page[dict]:
+        """Search a user's deals by brand name and notes, best matches first."""
+        limit = limit or settings.PAGE_SIZE_DEFAULT
+        after_rank, after_id = None, None
+        if cursor:
+            after_rank, after_id = decode_cursor(cursor, "rank")
+            if not isinstance(after_rank, (int, float)):
+                raise ValueError("Invalid cursor")
+        
+        term = _escape_like(query)
+        rows = await db.query_raw(
+            SEARCH_DEALS_SQL,
+            user_id,
+            query,
+            f"{term}%",
+            f"%{term}%",
+            after_rank,
+            after_id,
+            limit + 1
+        )
+        if len(rows) <= limit:
+            return Page(items=rows)
+        
+        items = rows[:limit]
+        last = items[-1]
+        return Page(items=items, next_cursor=encode_cursor("rank", last["rank"], last["id"]))
+    
+    @staticmethod
+    def include_arg(include: Sequence[str]) -> Optional[dict]:
+        """Prisma include for the given DEAL_RELATIONS, or None for none."""
+        if not include:
+            return None
+        return {relation: {"order_by": DEAL_RELATIONS[relation]} for relation in include}
+    
+    @staticmethod
+    async def _find_deal(db: Prisma, deal_id: int, user_id: str) -> Optional[Deal]:
         return await db.deal.find_first(
             where={
                 "id": deal_id,
@@ -24,55 +177,205 @@ class DealService:
         )
     
     @staticmethod
-    async def create_deal(db: Prisma, user_id: str, deal_data: DealCreate) -> Deal:
-        """Create a new deal."""
+    async def get_deal(
+        db: Prisma,
+        deal_id: int,
+        user_id: str,
+        include: Sequence[str] = (),
+        cached: bool = True
+    ) -> Optional[Deal]:
+        """Get a single deal by ID, ensuring it belongs to the user."""
+        if include:
+            return await db.deal.find_first(
+                where={"id": deal_id, "userId": user_id},
+                include=DealService.include_arg(include)
+            )
+        # Another worker may hold an older cached copy, so the cache is only
+        # for ownership checks; anything returned to the client uses cached=False
+        if deal_cache is None or not cached:
+            return await deal_loader.load(db, user_id, deal_id)
+        return await deal_cache.get_or_load(
+            deal_cache_key(user_id, deal_id),
+            lambda: deal_loader.load(db, user_id, deal_id)
+        )
+    
+    @staticmethod
+    async def _invalidate(user_id: str, deal_ids: List[int]) -> None:
+        if deal_cache is not None:
+            for deal_id in deal_ids:
+                await deal_cache.invalidate(deal_cache_key(user_id, deal_id))
+    
+    @staticmethod
+    def _create_dict(user_id: str, deal_data: DealCreate) -> dict:
         # Convert Pydantic model to Prisma dict
         deal_dict = deal_data.model_dump(by_alias=True, exclude_none=True)
         deal_dict["userId"] = user_id
         
         # Convert status and platform to enum values
-        from prisma.enums import DealStatus, Platform
         deal_dict["status"] = DealStatus(deal_dict["status"])
         deal_dict["platform"] = Platform(deal_dict["platform"])
+        return deal_dict
+    
+    @staticmethod
+    def _update_dict(deal_data: DealUpdate) -> dict:
+        # Batch updates carry the target id on the model; it is not a column update
+        update_dict = deal_data.model_dump(by_alias=True, exclude_none=True, exclude={"id"})
         
-        return await db.deal.create(data=deal_dict)
+        # Convert enums if present
+        if "status" in update_dict:
+            update_dict["status"] = DealStatus(update_dict["status"])
+        if "platform" in update_dict:
+            update_dict["platform"] = Platform(update_dict["platform"])
+        return update_dict
     
     @staticmethod
-    async def update_deal(
-        db: Prisma,
+    async def _update_in_tx(
+        tx: Prisma,
         deal_id: int,
         user_id: str,
-        deal_data: DealUpdate
+        update_dict: dict,
+        deltas: RollupDeltas
     ) -> Optional[Deal]:
-        """Update a deal, ensuring it belongs to the user."""
         # Check if deal exists and belongs to user
-        existing = await DealService.get_deal(db, deal_id, user_id)
+        await RollupService.lock_row(tx, "deals", deal_id)
+        existing = await DealService._find_deal(tx, deal_id, user_id)
         if not existing:
             return None
         
-        # Convert update data
-        update_dict = deal_data.model_dump(by_alias=True, exclude_none=True)
-        
-        # Convert enums if present
-        if "status" in update_dict:
-            from prisma.enums import DealStatus
-            update_dict["status"] = DealStatus(update_dict["status"])
-        if "platform" in update_dict:
-            from prisma.enums import Platform
-            update_dict["platform"] = Platform(update_dict["platform"])
-        
-        return await db.deal.update(
+        deal = await tx.deal.update(
             where={"id": deal_id},
             data=update_dict
         )
+        
+        # Move the deal's value between status rollups; the caller applies
+        # the collected deltas once, in status order
+        deltas.add_deal(existing.status, -1, -existing.dealValue)
+        deltas.add_deal(deal.status, 1, deal.dealValue)
+        return deal
     
     @staticmethod
-    async def delete_deal(db: Prisma, deal_id: int, user_id: str) -> bool:
-        """Delete a deal, ensuring it belongs to the user."""
-        existing = await DealService.get_deal(db, deal_id, user_id)
+    async def _delete_in_tx(
+        tx: Prisma,
+        deal_id: int,
+        user_id: str,
+        deltas: RollupDeltas
+    ) -> bool:
+        await RollupService.lock_row(tx, "deals", deal_id)
+        existing = await DealService._find_deal(tx, deal_id, user_id)
         if not existing:
             return False
         
-        await db.deal.delete(where={"id": deal_id})
+        # Payments and contracts are removed by the cascade, so take the
+        # payments out of the rollups and queue the contract files
+        await RollupService.remove_deal_payments(tx, deal_id, deltas)
+        await StorageDeletionQueue.enqueue_deal_files(tx, deal_id)
+        await tx.deal.delete(where={"id": deal_id})
+        deltas.add_deal(existing.status, -1, -existing.dealValue)
         return True
-
+    
+    @staticmethod
+    async def create_deal(db: Prisma, user_id: str, deal_data: DealCreate) -> Deal:
+        """Create a new deal."""
+        deal_dict = DealService._create_dict(user_id, deal_data)
+        async with db.tx() as tx:
+            deal = await tx.deal.create(data=deal_dict)
+            await RollupService.apply_deal_delta(
+                tx, user_id, deal.status, 1, deal.dealValue
+            )
+            await VersionService.bump(tx, user_id, "deals")
+        return deal
+    
+    @staticmethod
+    async def update_deal(
+        db: Prisma,
+        deal_id: int,
+        user_id: str,
+        deal_data: DealUpdate
+    ) -> Optional[Deal]:
+        """Update a deal, ensuring it belongs to the user."""
+        update_dict = DealService._update_dict(deal_data)
+        deltas = RollupDeltas()
+        async with db.tx() as tx:
+            deal = await DealService._update_in_tx(tx, deal_id, user_id, update_dict, deltas)
+            if deal:
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "deals")
+        if deal:
+            await DealService._invalidate(user_id, [deal_id])
+        return deal
+    
+    @staticmethod
+    async def delete_deal(db: Prisma, deal_id: int, user_id: str) -> bool:
+        """Delete a deal, ensuring it belongs to the user."""
+        deltas = RollupDeltas()
+        async with db.tx() as tx:
+            deleted = await DealService._delete_in_tx(tx, deal_id, user_id, deltas)
+            if deleted:
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                # Payments and reminders of the deal go with it
+                await VersionService.bump(tx, user_id, "deals", "payments", "reminders")
+        if deleted:
+            await DealService._invalidate(user_id, [deal_id])
+        return deleted
+    
+    @staticmethod
+    async def create_deals(
+        db: Prisma,
+        user_id: str,
+        deals: List[DealCreate]
+    ) -> List[Deal]:
+        """Create many deals in one transaction, with one rollup delta per status."""
+        deal_dicts = [DealService._create_dict(user_id, deal_data) for deal_data in deals]
+        created = []
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            for deal_dict in deal_dicts:
+                created.append(await tx.deal.create(data=deal_dict))
+            
+            deltas = RollupDeltas()
+            for deal in created:
+                deltas.add_deal(deal.status, 1, deal.dealValue)
+            await RollupService.apply_deltas(tx, user_id, deltas)
+            if created:
+                await VersionService.bump(tx, user_id, "deals")
+        return created
+    
+    @staticmethod
+    async def update_deals(
+        db: Prisma,
+        user_id: str,
+        updates: List[Tuple[int, DealUpdate]]
+    ) -> List[Optional[Deal]]:
+        """Update many deals in one transaction; None where the deal is not the user's."""
+        update_dicts = [
+            (deal_id, DealService._update_dict(deal_data)) for deal_id, deal_data in updates
+        ]
+        updated: List[Optional[Deal]] = [None] * len(update_dicts)
+        deltas = RollupDeltas()
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            for index in sorted(range(len(update_dicts)), key=lambda i: update_dicts[i][0]):
+                deal_id, update_dict = update_dicts[index]
+                updated[index] = await DealService._update_in_tx(
+                    tx, deal_id, user_id, update_dict, deltas
+                )
+            if any(updated):
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "deals")
+        await DealService._invalidate(
+            user_id, [deal_id for (deal_id, _), deal in zip(update_dicts, updated) if deal]
+        )
+        return updated
+    
+    @staticmethod
+    async def delete_deals(db: Prisma, user_id: str, deal_ids: List[int]) -> List[bool]:
+        """Delete many deals in one transaction; returns whether each id was deleted."""
+        deleted = set()
+        deltas = RollupDeltas()
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            for deal_id in sorted(set(deal_ids)):
+                if await DealService._delete_in_tx(tx, deal_id, user_id, deltas):
+                    deleted.add(deal_id)
+            if deleted:
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "deals", "payments", "reminders")
+        await DealService._invalidate(user_id, sorted(deleted))
+        return [deal_id in deleted for deal_id in deal_ids]
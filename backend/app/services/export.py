@@ -0,0 +1,205 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, List, Type, get_args
+from pydantic import BaseModel
+from prisma import Prisma
+from app.core.config import settings
+from app.core.serialization import dump_rows
+from app.models.contract import ContractResponse
+from app.models.deal import DealResponse
+from app.models.payment import PaymentResponse
+from app.services.contracts import ContractService
+from app.services.deals import DealService
+from app.services.payments import PaymentService
+
+
+# resource -> (paginated service call, response model used for the columns)
+EXPORT_RESOURCES = {
+    "deals": (DealService.get_deals, DealResponse),
+    "payments": (PaymentService.get_payments, PaymentResponse),
+    "contracts": (ContractService.get_contracts, ContractResponse),
+}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _columns(model: Type[BaseModel]) -> List[str]:
+    return [info.alias or name for name, info in model.model_fields.items()]
+
+
+class CsvExportWriter:
+    def __init__(self, model: Type[BaseModel]):
+        self.columns = _columns(model)
+
+    def _encode(self, rows: List[list]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def start(self) -> bytes:
+        return self._encode([self.columns])
+
+    def write(self, rows: List[dict]) -> bytes:
+        return self._encode([
+            ["" if row[column] is None else row[column] for column in self.columns]
+            for row in rows
+        ])
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonExportWriter:
+    def __init__(self, model: Type[BaseModel]):
+        pass
+
+    def start(self) -> bytes:
+        return b""
+
+    def write(self, rows: List[dict]) -> bytes:
+        return "".join(
+            json.dumps(row, separators=(",", ":")) + "\n" for row in rows
+        ).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._buffer.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer = io.BytesIO()
+        return data
+
+
+class ParquetExportWriter:
+    """Writes one Parquet row group per page. Needs the optional pyarrow package."""
+
+    def __init__(self, model: Type[BaseModel]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires the pyarrow package")
+        self._pa = pa
+        self._pq = pq
+        self.schema = pa.schema([
+            (info.alias or name, self._arrow_type(info.annotation))
+            for name, info in model.model_fields.items()
+        ])
+        self._sink = _ChunkSink()
+        self._writer = None
+
+    def _arrow_type(self, annotation):
+        # Optional[X] -> X
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if args:
+            annotation = args[0]
+        types = {
+            int: self._pa.int64(),
+            str: self._pa.string(),
+            bool: self._pa.bool_(),
+            Decimal: self._pa.decimal128(12, 2),
+            datetime: self._pa.timestamp("us", tz="UTC"),
+        }
+        return types.get(annotation, self._pa.string())
+
+    def start(self) -> bytes:
+        self._writer = self._pq.ParquetWriter(
+            self._pa.PythonFile(self._sink, mode="w"), self.schema
+        )
+        return self._sink.take()
+
+    def write(self, rows: List[dict]) -> bytes:
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self.schema))
+        return self._sink.take()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
+
+
+EXPORT_WRITERS = {
+    "csv": CsvExportWriter,
+    "ndjson": NdjsonExportWriter,
+    "parquet": ParquetExportWriter,
+}
+
+
+class ExportService:
+    """
+    Streams every deal, payment or contract of a user as CSV, NDJSON or
+    Parquet. Rows are read one keyset page at a time and encoded straight
+    away, so only one page is ever held in memory.
+    """
+
+    @staticmethod
+    def create_writer(resource: str, fmt: str):
+        """Build the writer up front so a missing optional dependency fails before streaming."""
+        _, model = EXPORT_RESOURCES[resource]
+        return EXPORT_WRITERS[fmt](model)
+
+    @staticmethod
+    async def iter_pages(
+        db: Prisma,
+        user_id: str,
+        resource: str,
+        page_size: int = settings.EXPORT_PAGE_SIZE
+    ) -> AsyncIterator[list]:
+        fetch, _ = EXPORT_RESOURCES[resource]
+        cursor = None
+        while True:
+            page = await fetch(db, user_id, limit=page_size, cursor=cursor)
+            if page.items:
+                yield page.items
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+
+    @staticmethod
+    async def stream(
+        db: Prisma,
+        user_id: str,
+        resource: str,
+        writer,
+        page_size: int = settings.EXPORT_PAGE_SIZE
+    ) -> AsyncIterator[bytes]:
+        _, model = EXPORT_RESOURCES[resource]
+        mode = "python" if isinstance(writer, ParquetExportWriter) else "json"
+
+        yield writer.start()
+        async for rows in ExportService.iter_pages(db, user_id, resource, page_size):
+            chunk = writer.write(dump_rows(model, rows, mode))
+            if chunk:
+                yield chunk
+        yield writer.finish()
+
@@ -0,0 +1,395 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import sys
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from prisma import Prisma
+from pydantic import ValidationError
+from app.core.config import settings
+from app.models.deal import DealCreate
+from app.models.payment import PaymentCreate
+from app.services.deals import DealService
+from app.services.payments import PaymentService
+
+logger = logging.getLogger(__name__)
+
+
+IMPORT_KINDS = ("deals", "payments")
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Per-row errors kept in the report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Longest accepted row; longer ones are reported as invalid and skipped
+MAX_RECORD_SIZE = 1024 * 1024
+
+# (row number, parsed row or None, parse error or None)
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+@dataclass
+class ImportReport:
+    """Running totals for one import job."""
+    kind: str
+    processed: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+    errors_truncated: bool = False
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+        else:
+            self.errors_truncated = True
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Decode a byte stream as UTF-8 (BOM tolerated) and yield it line by
+    line. A line longer than MAX_RECORD_SIZE is yielded as None and the
+    rest of it is skipped, so memory stays bounded and the next line is
+    read as usual.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    skipping = False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        if skipping:
+            if not lines:
+                pending = ""
+                continue
+            # The tail of the oversized line
+            del lines[0]
+            skipping = False
+        for line in lines:
+            yield line.rstrip("\r") if len(line) <= MAX_RECORD_SIZE else None
+        if len(pending) > MAX_RECORD_SIZE:
+            yield None
+            pending = ""
+            skipping = True
+    pending += decoder.decode(b"", final=True)
+    if pending and not skipping:
+        yield pending.rstrip("\r") if len(pending) <= MAX_RECORD_SIZE else None
+
+
+def _ends_in_quotes(line: str, in_quotes: bool) -> bool:
+    """
+    Whether a CSV record is still inside a quoted field at the end of
+    `line`, by csv.reader's rules: a quote opens a field only as its first
+    character (elsewhere it is literal), and "" inside quotes is a quote.
+    """
+    i = 0
+    while True:
+        i = line.find('"', i)
+        if i < 0:
+            return in_quotes
+        if in_quotes:
+            if line.startswith('"', i + 1):
+                i += 2
+                continue
+            in_quotes = False
+        elif i == 0 or line[i - 1] == ",":
+            in_quotes = True
+        i += 1
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    Parse CSV with a header row. Lines are gathered while a quoted field
+    is still open and the record is then read by csv.reader, so values may
+    contain newlines. Empty cells are dropped so optional fields fall back
+    to their defaults. A record over MAX_RECORD_SIZE is reported as an
+    invalid row and skipped.
+    """
+    header = None
+    record: List[str] = []
+    record_size = 0
+    in_quotes = False
+    row_number = 0
+    async for line in iter_lines(chunks):
+        error = None
+        if line is None:
+            error = f"Row exceeds {MAX_RECORD_SIZE} characters"
+        else:
+            record.append(line + "\n")
+            record_size += len(line) + 1
+            in_quotes = _ends_in_quotes(line, in_quotes)
+            if in_quotes:
+                if record_size <= MAX_RECORD_SIZE:
+                    continue
+                error = "Unterminated quoted field"
+        if error:
+            if header is None:
+                raise ValueError(f"Header row: {error}")
+            row_number += 1
+            record, record_size, in_quotes = [], 0, False
+            yield row_number, None, error
+            continue
+
+        lines, record, record_size = record, [], 0
+        if len(lines) == 1 and not lines[0].strip():
+            continue
+
+        values = next(csv.reader(lines))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {
+            name: value for name, value in zip(header, values) if value != ""
+        }, None
+
+    if record:
+        yield row_number + 1, None, "Unterminated quoted field"
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """Parse newline-delimited JSON, one object per line."""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if line is not None and not line.strip():
+            continue
+        row_number += 1
+        if line is None:
+            yield row_number, None, f"Row exceeds {MAX_RECORD_SIZE} characters"
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, row, None
+
+
+def parse_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[ParsedRow]:
+    if fmt == "csv":
+        return iter_csv_rows(chunks)
+    if fmt == "ndjson":
+        return iter_ndjson_rows(chunks)
+    raise ValueError(f"Unknown import format '{fmt}', expected 'csv' or 'ndjson'")
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+        for err in e.errors()
+    )
+
+
+class ImportService:
+    """
+    Streams deals or payments from CSV/NDJSON into the database. Rows are
+    validated one at a time and written in chunks of `chunk_size`, each
+    chunk in its own transaction through the batch service methods, so
+    memory stays bounded by the chunk size whatever the file size. Bad rows
+    are reported by row number and never abort the job.
+    """
+
+    @staticmethod
+    async def run(
+        db: Prisma,
+        user_id: str,
+        kind: str,
+        rows: AsyncIterator[ParsedRow],
+        chunk_size: int = settings.IMPORT_CHUNK_SIZE,
+        on_progress: Optional[Callable[[ImportReport], None]] = None
+    ) -> ImportReport:
+        if kind not in IMPORT_KINDS:
+            raise ValueError(f"Unknown import kind '{kind}', expected 'deals' or 'payments'")
+
+        report = ImportReport(kind=kind)
+        brand_deals: Dict[str, List[int]] = {}
+        chunk: List[Tuple[int, dict]] = []
+
+        async def flush() -> None:
+            if kind == "deals":
+                await ImportService._write_deals(db, user_id, chunk, report)
+            else:
+                await ImportService._write_payments(db, user_id, chunk, report, brand_deals)
+            chunk.clear()
+            if on_progress:
+                on_progress(report)
+
+        async for row_number, row, error in rows:
+            report.processed += 1
+            if error:
+                report.add_error(row_number, error)
+                continue
+            chunk.append((row_number, row))
+            if len(chunk) >= chunk_size:
+                await flush()
+
+        if chunk:
+            await flush()
+        return report
+
+    @staticmethod
+    async def _write_deals(
+        db: Prisma,
+        user_id: str,
+        chunk: List[Tuple[int, dict]],
+        report: ImportReport
+    ) -> None:
+        numbers, deals = [], []
+        for row_number, row in chunk:
+            try:
+                deals.append(DealCreate.model_validate(row))
+                numbers.append(row_number)
+            except ValidationError as e:
+                report.add_error(row_number, _validation_message(e))
+        if not deals:
+            return
+
+        try:
+            created = await DealService.create_deals(db, user_id, deals)
+        except Exception as e:
+            logger.exception("Deal import chunk failed")
+            for row_number in numbers:
+                report.add_error(row_number, f"Write failed: {e}")
+            return
+        report.created += len(created)
+
+    @staticmethod
+    async def _resolve_brands(
+        db: Prisma,
+        user_id: str,
+        names: List[str],
+        brand_deals: Dict[str, List[int]]
+    ) -> None:
+        """Look up the deal ids of brand names not seen yet in this job."""
+        missing = [name for name in set(names) if name not in brand_deals]
+        if not missing:
+            return
+
+        deals = await db.deal.find_many(
+            where={"userId": user_id, "brandName": {"in": missing}}
+        )
+        for name in missing:
+            brand_deals[name] = []
+        for deal in deals:
+            brand_deals[deal.brandName].append(deal.id)
+
+    @staticmethod
+    async def _write_payments(
+        db: Prisma,
+        user_id: str,
+        chunk: List[Tuple[int, dict]],
+        report: ImportReport,
+        brand_deals: Dict[str, List[int]]
+    ) -> None:
+        await ImportService._resolve_brands(
+            db,
+            user_id,
+            [row["brandName"] for _, row in chunk if "dealId" not in row and "brandName" in row],
+            brand_deals
+        )
+
+        numbers, payments = [], []
+        for row_number, row in chunk:
+            if "dealId" not in row and "brandName" in row:
+                brand = row.pop("brandName")
+                deal_ids = brand_deals[brand]
+                if not deal_ids:
+                    report.add_error(row_number, f"No deal found for brand '{brand}'")
+                    continue
+                if len(deal_ids) > 1:
+                    report.add_error(row_number, f"Brand '{brand}' matches several deals, use dealId")
+                    continue
+                row["dealId"] = deal_ids[0]
+            try:
+                payments.append(PaymentCreate.model_validate(row))
+                numbers.append(row_number)
+            except ValidationError as e:
+                report.add_error(row_number, _validation_message(e))
+        if not payments:
+            return
+
+        try:
+            created = await PaymentService.create_payments(db, user_id, payments)
+        except Exception as e:
+            logger.exception("Payment import chunk failed")
+            for row_number in numbers:
+                report.add_error(row_number, f"Write failed: {e}")
+            return
+
+        for row_number, payment in zip(numbers, created):
+            if payment:
+                report.created += 1
+            else:
+                report.add_error(row_number, "Deal not found")
+
+
+async def iter_file(path: str, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Import deals or payments for one user from a CSV or NDJSON file."
+    )
+    parser.add_argument("kind", choices=IMPORT_KINDS)
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--user", dest="user_id", required=True, help="User ID to import for")
+    parser.add_argument(
+        "--format",
+        choices=IMPORT_FORMATS,
+        default=None,
+        help="File format (default: from the file extension)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    def progress(report: ImportReport) -> None:
+        print(
+            f"{report.processed} row(s) processed, {report.created} created, {report.failed} failed",
+            file=sys.stderr
+        )
+
+    db = Prisma()
+    await db.connect()
+    try:
+        report = await ImportService.run(
+            db,
+            args.user_id,
+            args.kind,
+            parse_rows(iter_file(args.path), fmt),
+            chunk_size=args.chunk_size,
+            on_progress=progress
+        )
+    finally:
+        await db.disconnect()
+
+    for error in report.errors:
+        print(f"row {error['row']}: {error['error']}")
+    if report.errors_truncated:
+        print(f"... only the first {MAX_REPORTED_ERRORS} errors are listed")
+    print(f"Imported {report.created} of {report.processed} {args.kind} ({report.failed} failed)")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
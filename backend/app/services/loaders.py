@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from prisma import Prisma
+from app.core.config import settings
+
+
+# Upper bounds of the batch-size histogram buckets; larger batches go in "+Inf"
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+# (db, user_id, ids) -> rows with an `id` attribute, only those the user owns
+BatchFetch = Callable[[Prisma, str, List[int]], Awaitable[List[Any]]]
+
+
+class BatchLoader:
+    """
+    DataLoader-style lookup of rows by id. Loads issued in the same event
+    loop tick, from any number of concurrent requests, are coalesced into
+    one `id IN (...)` query per user, and repeated ids share a single
+    lookup. Results are not kept past the batch; caching is left to the
+    caller (see deal_cache).
+    """
+
+    def __init__(self, name: str, fetch: BatchFetch, max_batch_size: int):
+        self.name = name
+        self.fetch = fetch
+        self.max_batch_size = max_batch_size
+        # user_id -> (db of the first caller, id -> future)
+        self._pending: Dict[str, Tuple[Prisma, Dict[int, asyncio.Future]]] = {}
+        self._scheduled = False
+        self._tasks: set = set()
+        self.loads = 0
+        self.queries = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._batched = 0
+
+    async def load(self, db: Prisma, user_id: str, row_id: int) -> Optional[Any]:
+        """Return the row with this id if the user owns it, else None."""
+        self.loads += 1
+        loop = asyncio.get_running_loop()
+        _, futures = self._pending.setdefault(user_id, (db, {}))
+        future = futures.get(row_id)
+        if future is None:
+            future = futures[row_id] = loop.create_future()
+        if not self._scheduled:
+            self._scheduled = True
+            # In a fresh context, so the batch's queries are not counted
+            # against the request that happened to load first
+            loop.call_soon(self._dispatch, context=contextvars.Context())
+        # Shielded so one cancelled caller does not cancel the shared lookup
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        for user_id, (db, futures) in pending.items():
+            ids = list(futures)
+            for start in range(0, len(ids), self.max_batch_size):
+                chunk = {row_id: futures[row_id] for row_id in ids[start:start + self.max_batch_size]}
+                task = asyncio.ensure_future(self._run(db, user_id, chunk))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, db: Prisma, user_id: str, futures: Dict[int, asyncio.Future]) -> None:
+        self.queries += 1
+        self._histogram[bisect_left(BATCH_SIZE_BUCKETS, len(futures))] += 1
+        self._batched += len(futures)
+        try:
+            rows = await self.fetch(db, user_id, list(futures))
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_id = {row.id: row for row in rows}
+        for row_id, future in futures.items():
+            if not future.done():
+                future.set_result(by_id.get(row_id))
+
+    def stats(self) -> dict:
+        labels = [str(bound) for bound in BATCH_SIZE_BUCKETS] + ["+Inf"]
+        return {
+            "loads": self.loads,
+            "queries": self.queries,
+            "loads_per_query": self.loads / self.queries if self.queries else 0.0,
+            "batch_sizes": dict(zip(labels, self._histogram)),
+        }
+
+    def histogram(self) -> Tuple[Tuple[int, ...], List[int], int]:
+        """Batch-size bucket bounds, per-bucket counts (the last is +Inf) and the sum of sizes."""
+        return BATCH_SIZE_BUCKETS, list(self._histogram), self._batched
+
+
+async def _fetch_deals(db: Prisma, user_id: str, ids: List[int]) -> list:
+    return await db.deal.find_many(where={"id": {"in": ids}, "userId": user_id})
+
+
+async def _fetch_payments(db: Prisma, user_id: str, ids: List[int]) -> list:
+    return await db.payment.find_many(
+        where={"id": {"in": ids}, "deal": {"is": {"userId": user_id}}}
+    )
+
+
+async def _fetch_contracts(db: Prisma, user_id: str, ids: List[int]) -> list:
+    return await db.contract.find_many(
+        where={"id": {"in": ids}, "deal": {"is": {"userId": user_id}}}
+    )
+
+
+# Global instances
+deal_loader = BatchLoader("deals", _fetch_deals, settings.LOADER_MAX_BATCH_SIZE)
+payment_loader = BatchLoader("payments", _fetch_payments, settings.LOADER_MAX_BATCH_SIZE)
+contract_loader = BatchLoader("contracts", _fetch_contracts, settings.LOADER_MAX_BATCH_SIZE)
+
+
+LOADERS = (deal_loader, payment_loader, contract_loader)
+
+
+def loader_stats() -> dict:
+    return {loader.name: loader.stats() for loader in LOADERS}
+
+
+def loader_histograms() -> dict:
+    return {loader.name: loader.histogram() for loader in LOADERS}
@@ -0,0 +1,132 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Generic, List, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+CursorValue = Union[datetime, Decimal, float, None]
+
+
+@dataclass
+class Page(Generic[T]):
+    """One page of a keyset-paginated list."""
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def _cursor_key(sort_field: str, direction: str) -> str:
+    # Descending keys are the bare field name, as issued before sort directions existed
+    return sort_field if direction == "desc" else f"{sort_field}:{direction}"
+
+
+def encode_cursor(
+    sort_field: str,
+    value: CursorValue,
+    row_id: int,
+    direction: str = "desc"
+) -> str:
+    """Build an opaque cursor pointing just past (value, row_id)."""
+    payload = {"k": _cursor_key(sort_field, direction), "v": value, "id": row_id}
+    if isinstance(value, datetime):
+        payload["v"] = value.isoformat()
+    elif isinstance(value, Decimal):
+        payload["v"] = str(value)
+        payload["t"] = "dec"
+    encoded = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(encoded.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    sort_field: str,
+    direction: str = "desc"
+) -> Tuple[CursorValue, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed or was issued for
+    a different sort key or direction.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != _cursor_key(sort_field, direction):
+            raise ValueError
+        value = payload["v"]
+        if payload.get("t") == "dec":
+            value = Decimal(value)
+        elif isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+            raise ValueError
+        return value, int(payload["id"])
+    except (ValueError, ArithmeticError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_order(sort_field: str, direction: str = "desc") -> list:
+    """Order by the sort field with id as a tiebreaker, so pages are stable."""
+    return [{sort_field: direction}, {"id": direction}]
+
+
+def keyset_where(
+    sort_field: str,
+    cursor: Optional[str],
+    direction: str = "desc",
+    value_type: type = datetime,
+    nullable: bool = False
+) -> dict:
+    """
+    Prisma where-clause fragment selecting rows strictly after the cursor
+    in keyset_order. Returns an empty dict for the first page.
+
+    For nullable fields this follows Postgres' default placement of NULLs:
+    last when ascending, first when descending.
+    """
+    if not cursor:
+        return {}
+
+    value, row_id = decode_cursor(cursor, sort_field, direction)
+    if value is None and not nullable or value is not None and not isinstance(value, value_type):
+        raise ValueError("Invalid cursor")
+
+    past = "gt" if direction == "asc" else "lt"
+    if value is None:
+        after_nulls = [{sort_field: None, "id": {past: row_id}}]
+        if direction == "desc":
+            # The non-null values all come after the NULLs
+            after_nulls.append({sort_field: {"not": None}})
+        return {"OR": after_nulls}
+
+    after = [
+        {sort_field: {past: value}},
+        {sort_field: value, "id": {past: row_id}},
+    ]
+    if nullable and direction == "asc":
+        after.append({sort_field: None})
+    return {"OR": after}
+
+
+def keyset_take(limit: Optional[int]) -> Optional[int]:
+    """Fetch one extra row so we know whether another page exists."""
+    return limit + 1 if limit else None
+
+
+def build_page(
+    rows: List[T],
+    limit: Optional[int],
+    sort_field: str,
+    direction: str = "desc"
+) -> Page[T]:
+    """Trim the look-ahead row and compute the next cursor."""
+    if not limit or len(rows) <= limit:
+        return Page(items=rows)
+
+    items = rows[:limit]
+    last = items[-1]
+    return Page(
+        items=items,
+        next_cursor=encode_cursor(sort_field, getattr(last, sort_field), last.id, direction)
+    )
@@ -1,74 +1,237 @@
 from prisma import Prisma
 from app.models.payment import PaymentCreate, PaymentUpdate
-from typing import List, Optional
+from app.services.deals import BATCH_TX_TIMEOUT
+from app.services.rollups import RollupDeltas, RollupService
+from app.services.versions import VersionService
+from app.services.loaders import payment_loader
+from app.services.pagination import (
+    Page, build_page, keyset_order, keyset_take, keyset_where
+)
+from typing import List, Optional, Tuple
+from decimal import Decimal
 from prisma.models import Payment
 
 
+# Ownership check and row lock in one statement
+LOCK_OWNED_DEAL_SQL = """
+    SELECT id FROM deals WHERE id = $1 AND user_id = $2 FOR UPDATE
+"""
+
+# Locks the deal, not the payment (lock order in app.services.rollups)
+LOCK_OWNED_PAYMENT_SQL = """
+    SELECT p.id, p.paid, p.amount::text AS amount
+    FROM payments p
+    JOIN deals d ON d.id = p.deal_id
+    WHERE p.id = $1 AND d.user_id = $2
+    FOR UPDATE OF d
+"""
+
+
 class PaymentService:
     @staticmethod
-    async def get_payments(db: Prisma, user_id: str) -> List[Payment]:
-        """Get all payments for deals belonging to a user."""
-        # Get all user's deals first
-        user_deals = await db.deal.find_many(
-            where={"userId": user_id},
-            select={"id": True}
+    async def get_payments(
+        db: Prisma,
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Page[Payment]:
+        """Get a page of payments for deals belonging to a user."""
+        # Filter through the deal relation so this is a single query
+        rows = await db.payment.find_many(
+            where={
+                "deal": {"is": {"userId": user_id}},
+                **keyset_where("createdAt", cursor)
+            },
+            order=keyset_order("createdAt"),
+            take=keyset_take(limit)
         )
-        deal_ids = [deal.id for deal in user_deals]
-        
-        if not deal_ids:
-            return []
-        
-        # Get payments for all user's deals
-        # Note: Prisma Python "in" syntax may need adjustment
-        # Alternative: Loop through deals and collect payments
-        all_payments = []
-        for deal_id in deal_ids:
-            payments = await db.payment.find_many(
-                where={"dealId": deal_id},
-                order=[{"createdAt": "desc"}]
-            )
-            all_payments.extend(payments)
-        return sorted(all_payments, key=lambda p: p.createdAt, reverse=True)
+        return build_page(rows, limit, "createdAt")
     
     @staticmethod
-    async def get_payments_by_deal(db: Prisma, deal_id: int) -> List[Payment]:
-        """Get all payments for a specific deal."""
-        return await db.payment.find_many(
-            where={"dealId": deal_id},
-            order=[{"createdAt": "desc"}]
+    async def get_payments_by_deal(
+        db: Prisma,
+        deal_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Page[Payment]:
+        """Get a page of payments for a specific deal."""
+        rows = await db.payment.find_many(
+            where={"dealId": deal_id, **keyset_where("createdAt", cursor)},
+            order=keyset_order("createdAt"),
+            take=keyset_take(limit)
         )
+        return build_page(rows, limit, "createdAt")
+    
+    @staticmethod
+    async def get_payment(
+        db: Prisma,
+        payment_id: int,
+        user_id: str
+    ) -> Optional[Payment]:
+        """Get a single payment by ID, ensuring its deal belongs to the user."""
+        return await payment_loader.load(db, user_id, payment_id)
+    
+    @staticmethod
+    async def _update_in_tx(
+        tx: Prisma,
+        payment_id: int,
+        user_id: str,
+        update_dict: dict,
+        deltas: RollupDeltas
+    ) -> Optional[Payment]:
+        rows = await tx.query_raw(LOCK_OWNED_PAYMENT_SQL, payment_id, user_id)
+        if not rows:
+            return None
+        existing = rows[0]
+        
+        payment = await tx.payment.update(
+            where={"id": payment_id},
+            data=update_dict
+        )
+        deltas.add_payment(bool(existing["paid"]), -1, -Decimal(existing["amount"]))
+        deltas.add_payment(payment.paid, 1, payment.amount)
+        return payment
+    
+    @staticmethod
+    async def _delete_in_tx(
+        tx: Prisma,
+        payment_id: int,
+        user_id: str,
+        deltas: RollupDeltas
+    ) -> bool:
+        rows = await tx.query_raw(LOCK_OWNED_PAYMENT_SQL, payment_id, user_id)
+        if not rows:
+            return False
+        existing = rows[0]
+        
+        await tx.payment.delete(where={"id": payment_id})
+        deltas.add_payment(bool(existing["paid"]), -1, -Decimal(existing["amount"]))
+        return True
     
     @staticmethod
-    async def get_payment(db: Prisma, payment_id: int) -> Optional[Payment]:
-        """Get a single payment by ID."""
-        return await db.payment.find_unique(where={"id": payment_id})
+    async def _lock_deals_of(tx: Prisma, user_id: str, payment_ids: List[int]) -> None:
+        """Lock the deals of several payments before a batch changes them."""
+        payments = await tx.payment.find_many(
+            where={"id": {"in": list(set(payment_ids))}, "deal": {"is": {"userId": user_id}}}
+        )
+        for deal_id in sorted({payment.dealId for payment in payments}):
+            await tx.query_raw(LOCK_OWNED_DEAL_SQL, deal_id, user_id)
     
     @staticmethod
-    async def create_payment(db: Prisma, payment_data: PaymentCreate) -> Payment:
-        """Create a new payment."""
+    async def create_payment(
+        db: Prisma,
+        user_id: str,
+        payment_data: PaymentCreate
+    ) -> Optional[Payment]:
+        """Create a new payment; None if the deal is not the user's."""
         payment_dict = payment_data.model_dump(by_alias=True, exclude_none=True)
-        return await db.payment.create(data=payment_dict)
+        async with db.tx() as tx:
+            owned = await tx.query_raw(LOCK_OWNED_DEAL_SQL, payment_dict["dealId"], user_id)
+            if not owned:
+                return None
+            
+            payment = await tx.payment.create(data=payment_dict)
+            await RollupService.apply_payment_delta(
+                tx, user_id, payment.paid, 1, payment.amount
+            )
+            await VersionService.bump(tx, user_id, "payments")
+        return payment
     
     @staticmethod
     async def update_payment(
         db: Prisma,
         payment_id: int,
+        user_id: str,
         payment_data: PaymentUpdate
     ) -> Optional[Payment]:
-        """Update a payment."""
+        """Update a payment, ensuring its deal belongs to the user."""
         update_dict = payment_data.model_dump(by_alias=True, exclude_none=True)
-        return await db.payment.update(
-            where={"id": payment_id},
-            data=update_dict
-        )
+        deltas = RollupDeltas()
+        async with db.tx() as tx:
+            payment = await PaymentService._update_in_tx(tx, payment_id, user_id, update_dict, deltas)
+            if payment:
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "payments")
+        return payment
     
     @staticmethod
-    async def delete_payment(db: Prisma, payment_id: int) -> bool:
-        """Delete a payment."""
-        payment = await db.payment.find_unique(where={"id": payment_id})
-        if not payment:
-            return False
-        
-        await db.payment.delete(where={"id": payment_id})
-        return True
-
+    async def delete_payment(db: Prisma, payment_id: int, user_id: str) -> bool:
+        """Delete a payment, ensuring its deal belongs to the user."""
+        deltas = RollupDeltas()
+        async with db.tx() as tx:
+            deleted = await PaymentService._delete_in_tx(tx, payment_id, user_id, deltas)
+            if deleted:
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "payments")
+        return deleted
+    
+    @staticmethod
+    async def create_payments(
+        db: Prisma,
+        user_id: str,
+        payments: List[PaymentCreate]
+    ) -> List[Optional[Payment]]:
+        """Create many payments in one transaction; None where the deal is not the user's."""
+        payment_dicts = [
+            payment_data.model_dump(by_alias=True, exclude_none=True)
+            for payment_data in payments
+        ]
+        created = []
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            owned = set()
+            for deal_id in sorted({payment_dict["dealId"] for payment_dict in payment_dicts}):
+                if await tx.query_raw(LOCK_OWNED_DEAL_SQL, deal_id, user_id):
+                    owned.add(deal_id)
+            
+            deltas = RollupDeltas()
+            for payment_dict in payment_dicts:
+                if payment_dict["dealId"] not in owned:
+                    created.append(None)
+                    continue
+                payment = await tx.payment.create(data=payment_dict)
+                deltas.add_payment(payment.paid, 1, payment.amount)
+                created.append(payment)
+            
+            await RollupService.apply_deltas(tx, user_id, deltas)
+            if any(created):
+                await VersionService.bump(tx, user_id, "payments")
+        return created
+    
+    @staticmethod
+    async def update_payments(
+        db: Prisma,
+        user_id: str,
+        updates: List[Tuple[int, PaymentUpdate]]
+    ) -> List[Optional[Payment]]:
+        """Update many payments in one transaction; None where the payment is not the user's."""
+        update_dicts = [
+            (payment_id, payment_data.model_dump(by_alias=True, exclude_none=True, exclude={"id"}))
+            for payment_id, payment_data in updates
+        ]
+        deltas = RollupDeltas()
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            await PaymentService._lock_deals_of(tx, user_id, [payment_id for payment_id, _ in update_dicts])
+            updated = [
+                await PaymentService._update_in_tx(tx, payment_id, user_id, update_dict, deltas)
+                for payment_id, update_dict in update_dicts
+            ]
+            if any(updated):
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "payments")
+        return updated
+    
+    @staticmethod
+    async def delete_payments(db: Prisma, user_id: str, payment_ids: List[int]) -> List[bool]:
+        """Delete many payments in one transaction; returns whether each id was deleted."""
+        unique_ids = sorted(set(payment_ids))
+        deleted = set()
+        deltas = RollupDeltas()
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            await PaymentService._lock_deals_of(tx, user_id, unique_ids)
+            for payment_id in unique_ids:
+                if await PaymentService._delete_in_tx(tx, payment_id, user_id, deltas):
+                    deleted.add(payment_id)
+            if deleted:
+                await RollupService.apply_deltas(tx, user_id, deltas)
+                await VersionService.bump(tx, user_id, "payments")
+        return [payment_id in deleted for payment_id in payment_ids]
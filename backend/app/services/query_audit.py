@@ -0,0 +1,407 @@
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+from prisma import Prisma
+from prisma.enums import DealStatus
+from app.services.contracts import ContractService
+from app.services.dashboard import DashboardService
+from app.services.deals import DealService
+from app.services.imports import ImportService
+from app.services.payments import PaymentService
+from app.services.reminder_scheduler import MemoryNotifier, ReminderScheduler
+from app.services.reminders import ReminderService
+from app.services.rollups import RollupDeltas, RollupService
+from app.services.storage_queue import CLAIM_BATCH_SQL, CLAIM_LEASE
+from app.services.versions import VersionService
+
+
+AUDIT_USER_PREFIX = "audit-user-"
+
+# Tables smaller than this are expected to be scanned sequentially
+MIN_SCAN_ROWS = 1000
+
+# Statements worth explaining; the engine also logs BEGIN, COMMIT and the like
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+@dataclass
+class AuditStep:
+    """
+    One service call made against the seeded data. Every SQL statement
+    the Prisma engine sends while it runs is captured and explained.
+    `run` receives the transaction client and the sample ids.
+    """
+    name: str
+    run: Callable[[Prisma, dict], Awaitable[object]]
+    allow_sort: bool = False
+
+
+async def _update_deal(tx: Prisma, s: dict) -> None:
+    deltas = RollupDeltas()
+    await DealService._update_in_tx(tx, s["deal_id"], s["user_id"], {"status": DealStatus.paid}, deltas)
+    await RollupService.apply_deltas(tx, s["user_id"], deltas)
+    await VersionService.bump(tx, s["user_id"], "deals")
+
+
+async def _update_payment(tx: Prisma, s: dict) -> None:
+    deltas = RollupDeltas()
+    await PaymentService._lock_deals_of(tx, s["user_id"], [s["payment_id"]])
+    await PaymentService._update_in_tx(tx, s["payment_id"], s["user_id"], {"paid": True}, deltas)
+    await RollupService.apply_deltas(tx, s["user_id"], deltas)
+
+
+async def _delete_deal(tx: Prisma, s: dict) -> None:
+    deltas = RollupDeltas()
+    await DealService._delete_in_tx(tx, s["deal_id"], s["user_id"], deltas)
+    await RollupService.apply_deltas(tx, s["user_id"], deltas)
+    await VersionService.bump(tx, s["user_id"], "deals", "payments", "reminders")
+
+
+async def _dispatch_reminders(tx: Prisma, s: dict) -> None:
+    scheduler = ReminderScheduler(MemoryNotifier(), horizon=600, batch_size=500, max_age=86400)
+    await scheduler.refill(tx)
+    await scheduler.dispatch_due(tx)
+
+
+# The reads and writes the API and workers perform, through the service
+# code itself. Mutations call the services' in-transaction helpers, since
+# the public methods open transactions of their own. The deal is deleted
+# last because the other steps use it.
+AUDIT_STEPS: List[AuditStep] = [
+    AuditStep("deals.get_deals", lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100)),
+    AuditStep(
+        "deals.get_deals status filter",
+        lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100, filters={"status": "signed"}),
+    ),
+    AuditStep(
+        "deals.get_deals platform filter",
+        lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100, filters={"platform": "youtube"}),
+    ),
+    AuditStep(
+        "deals.get_deals sort=deadline",
+        lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100, sort="deadline", order="asc"),
+    ),
+    AuditStep(
+        "deals.get_deals sort=dealValue",
+        lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100, sort="dealValue"),
+    ),
+    AuditStep(
+        "deals.get_deals fields=id,brandName",
+        lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100, fields=("id", "brandName")),
+    ),
+    AuditStep(
+        # Relations of a whole page are read with one IN (...) query each and sorted
+        "deals.get_deals include=payments,contracts,reminders",
+        lambda tx, s: DealService.get_deals(
+            tx, s["user_id"], limit=100, include=("payments", "contracts", "reminders")
+        ),
+        allow_sort=True,
+    ),
+    AuditStep("deals.get_deal", lambda tx, s: DealService.get_deal(tx, s["deal_id"], s["user_id"], cached=False)),
+    AuditStep(
+        # Ranking needs the matches sorted; the trigram indexes keep the set small
+        "deals.search_deals",
+        lambda tx, s: DealService.search_deals(tx, s["user_id"], "Brand 42", limit=100),
+        allow_sort=True,
+    ),
+    AuditStep(
+        "imports brand lookup",
+        lambda tx, s: ImportService._resolve_brands(tx, s["user_id"], ["Brand 1", "Brand 2"], {}),
+    ),
+    # Payments and contracts have no user_id, so a user's rows are collected
+    # through deals and then sorted; the sort covers one user only.
+    AuditStep(
+        "payments.get_payments",
+        lambda tx, s: PaymentService.get_payments(tx, s["user_id"], limit=100),
+        allow_sort=True,
+    ),
+    AuditStep(
+        "payments.get_payments_by_deal",
+        lambda tx, s: PaymentService.get_payments_by_deal(tx, s["deal_id"], limit=100),
+    ),
+    AuditStep("payments.get_payment", lambda tx, s: PaymentService.get_payment(tx, s["payment_id"], s["user_id"])),
+    AuditStep(
+        "contracts.get_contracts",
+        lambda tx, s: ContractService.get_contracts(tx, s["user_id"], limit=100),
+        allow_sort=True,
+    ),
+    AuditStep(
+        "contracts.get_contracts_by_deal",
+        lambda tx, s: ContractService.get_contracts_by_deal(tx, s["deal_id"], limit=100),
+    ),
+    AuditStep(
+        "contracts.get_contract",
+        lambda tx, s: ContractService.get_contract(tx, s["contract_id"], s["user_id"]),
+    ),
+    AuditStep("reminders.get_reminders", lambda tx, s: ReminderService.get_reminders(tx, s["user_id"], limit=100)),
+    AuditStep(
+        "reminders.get_reminder",
+        lambda tx, s: ReminderService.get_reminder(tx, s["reminder_id"], s["user_id"]),
+    ),
+    AuditStep(
+        # Grouping the user's paid payments by platform may sort them
+        "dashboard.get_summary",
+        lambda tx, s: DashboardService.get_summary(tx, s["user_id"]),
+        allow_sort=True,
+    ),
+    AuditStep("reminder_scheduler refill and dispatch", _dispatch_reminders),
+    AuditStep(
+        "storage_queue claim",
+        lambda tx, s: tx.query_raw(CLAIM_BATCH_SQL, 100, CLAIM_LEASE.total_seconds()),
+    ),
+    AuditStep("deals update", _update_deal),
+    AuditStep("payments update", _update_payment),
+    AuditStep(
+        "contracts.delete_contract",
+        lambda tx, s: ContractService.delete_contract(tx, s["contract_id"], s["user_id"]),
+    ),
+    # Sums the deal's payments per paid flag before the cascade
+    AuditStep("deals delete", _delete_deal, allow_sort=True),
+]
+
+
+class EngineQueryLog:
+    """
+    The SQL the Prisma query engine runs, read from its query log. The
+    engine is a subprocess that builds SQL from the client's requests, so
+    the statements are only visible in its output: a client created with
+    log_queries=True makes it write one JSON line per statement (with its
+    parameters) to the standard output it was started with. `read_output`
+    returns what the engine wrote since it was last called, such as
+    pytest's capfd.readouterr().out.
+    """
+
+    def __init__(self, read_output: Callable[[], str]):
+        self._read_output = read_output
+        self._pending = ""
+
+    def read(self) -> List[Tuple[str, Optional[list]]]:
+        """
+        Statements logged since the last read, as (sql, params). params is
+        None when the logged parameters are not valid JSON.
+        """
+        # Leave a partly written last line for the next read
+        complete, _, self._pending = (self._pending + self._read_output()).rpartition("\n")
+
+        statements = []
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            fields = entry.get("fields", entry) if isinstance(entry, dict) else {}
+            sql = fields.get("query")
+            if not isinstance(sql, str):
+                continue
+            try:
+                params = json.loads(fields.get("params") or "[]")
+            except ValueError:
+                params = None
+            statements.append((sql, params if isinstance(params, list) else None))
+        return statements
+
+
+SEED_SQL = [
+    f"""
+    INSERT INTO users (id, created_at, updated_at)
+    SELECT '{AUDIT_USER_PREFIX}' || u, timezone('utc', now()), timezone('utc', now())
+    FROM generate_series(1, $1) u
+    """,
+    f"""
+    INSERT INTO deals (user_id, brand_name, platform, deal_value, status, deadline, notes, created_at)
+    SELECT '{AUDIT_USER_PREFIX}' || (1 + g % $1),
+           'Brand ' || (g % 997),
+           (ARRAY['instagram', 'youtube', 'tiktok', 'twitter', 'linkedin', 'other'])[1 + g % 6]::"Platform",
+           (g % 5000) + 0.5,
+           (ARRAY['lead', 'negotiation', 'signed', 'content_delivered', 'paid'])[1 + g % 5]::"DealStatus",
+           CASE WHEN g % 3 = 0 THEN NULL
+                ELSE timezone('utc', now()) + make_interval(days => g % 365) END,
+           'Audit note ' || md5(g::text),
+           timezone('utc', now()) - make_interval(mins => g)
+    FROM generate_series(1, $1 * $2) g
+    """,
+    f"""
+    INSERT INTO payments (deal_id, amount, paid, mode, created_at)
+    SELECT d.id, d.deal_value / 2, k = 1, 'bank', d.created_at + make_interval(mins => k)
+    FROM deals d CROSS JOIN generate_series(1, 2) k
+    WHERE d.user_id LIKE '{AUDIT_USER_PREFIX}%'
+    """,
+    f"""
+    INSERT INTO contracts (deal_id, file_url, file_name, created_at)
+    SELECT d.id, '/storage/contracts/' || d.user_id || '/' || d.id || '/audit.pdf', 'audit.pdf', d.created_at
+    FROM deals d
+    WHERE d.user_id LIKE '{AUDIT_USER_PREFIX}%' AND d.id % 4 = 0
+    """,
+    f"""
+    INSERT INTO reminders (user_id, deal_id, type, title, remind_at, sent, created_at)
+    SELECT d.user_id, d.id, 'follow_up'::"ReminderType", 'Follow up with ' || d.brand_name,
+           timezone('utc', now()) + make_interval(hours => (d.id % 2000) - 1000),
+           d.id % 2000 < 1000, d.created_at
+    FROM deals d
+    WHERE d.user_id LIKE '{AUDIT_USER_PREFIX}%'
+    """,
+    f"""
+    INSERT INTO storage_deletions (file_url, next_attempt_at, created_at)
+    SELECT file_url, timezone('utc', now()) + interval '1 hour', timezone('utc', now())
+    FROM contracts c JOIN deals d ON d.id = c.deal_id
+    WHERE d.user_id LIKE '{AUDIT_USER_PREFIX}%'
+    """,
+]
+
+SAMPLE_SQL = f"""
+    SELECT d.user_id, d.id AS deal_id,
+           (SELECT id FROM payments WHERE deal_id = d.id LIMIT 1) AS payment_id,
+           (SELECT c.id FROM contracts c JOIN deals cd ON cd.id = c.deal_id
+             WHERE cd.user_id = d.user_id LIMIT 1) AS contract_id,
+           (SELECT id FROM reminders WHERE user_id = d.user_id LIMIT 1) AS reminder_id
+    FROM deals d
+    WHERE d.user_id = '{AUDIT_USER_PREFIX}1'
+    ORDER BY d.id
+    LIMIT 1
+"""
+
+TABLE_SIZES_SQL = """
+    SELECT relname, reltuples::bigint AS row_estimate
+    FROM pg_class
+    WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace
+"""
+
+PREPARED_SQL = "SELECT name FROM pg_prepared_statements WHERE name = 'audit_statement'"
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _literal(value) -> str:
+    """A logged parameter as an untyped SQL literal, which takes the parameter's type."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def find_problems(plan: dict, table_rows: dict, allow_sort: bool) -> List[str]:
+    """Walk an EXPLAIN (FORMAT JSON) plan tree and list seq scans and sorts."""
+    problems = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        node_type = node.get("Node Type")
+        if node_type == "Seq Scan":
+            relation = node.get("Relation Name")
+            if table_rows.get(relation, 0) >= MIN_SCAN_ROWS:
+                problems.append(f"Seq Scan on {relation}")
+        elif node_type in ("Sort", "Incremental Sort") and not allow_sort:
+            problems.append(f"{node_type} on {', '.join(node.get('Sort Key', []))}")
+        stack.extend(node.get("Plans", []))
+    return problems
+
+
+class QueryAudit:
+    """
+    Seeds synthetic data, runs every AUDIT_STEPS service call (or the steps
+    given), captures the SQL the Prisma engine sends for each and runs
+    EXPLAIN (ANALYZE, BUFFERS) on each distinct statement. Sequential scans
+    of non-trivial tables and sorts that an index should have avoided are
+    reported. Everything happens in one transaction that is rolled back, so
+    the database is left unchanged; still, point it at a local or
+    disposable database.
+    """
+
+    @staticmethod
+    async def run(
+        db: Prisma,
+        log: EngineQueryLog,
+        users: int,
+        deals_per_user: int,
+        on_result: Optional[Callable[[str, str, Optional[dict], List[str]], None]] = None,
+        steps: Sequence[AuditStep] = AUDIT_STEPS
+    ) -> List[Tuple[str, List[str]]]:
+        """
+        `db` must have been created with log_queries=True, and connected
+        while its engine's output goes where `log` reads it. Returns
+        (statement name, problems) pairs.
+        """
+        results = []
+        seen = set()
+        try:
+            async with db.tx(timeout=timedelta(minutes=10)) as tx:
+                await QueryAudit._seed(tx, users, deals_per_user)
+                sample = (await tx.query_raw(SAMPLE_SQL))[0]
+                table_rows = {
+                    row["relname"]: row["row_estimate"]
+                    for row in await tx.query_raw(TABLE_SIZES_SQL)
+                }
+
+                for step in steps:
+                    log.read()
+                    await step.run(tx, sample)
+                    statements = [
+                        (sql, params) for sql, params in log.read()
+                        if sql.lstrip().upper().startswith(EXPLAINABLE) and sql not in seen
+                    ]
+                    for number, (sql, params) in enumerate(statements, 1):
+                        seen.add(sql)
+                        name = f"{step.name} #{number}" if len(statements) > 1 else step.name
+                        plan, problems = await QueryAudit._audit(tx, sql, params, table_rows, step.allow_sort)
+                        results.append((name, problems))
+                        if on_result:
+                            on_result(name, sql, plan, problems)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return results
+
+    @staticmethod
+    async def _seed(tx: Prisma, users: int, deals_per_user: int) -> None:
+        await tx.execute_raw(SEED_SQL[0], users)
+        await tx.execute_raw(SEED_SQL[1], users, deals_per_user)
+        for statement in SEED_SQL[2:]:
+            await tx.execute_raw(statement)
+        for table in ("users", "deals", "payments", "contracts", "reminders", "storage_deletions"):
+            await tx.execute_raw(f"ANALYZE {table}")
+
+    @staticmethod
+    async def _audit(
+        tx: Prisma,
+        sql: str,
+        params: Optional[list],
+        table_rows: dict,
+        allow_sort: bool
+    ) -> Tuple[Optional[dict], List[str]]:
+        if params is None:
+            return None, ["could not read the logged parameters"]
+        # A savepoint undoes what EXPLAIN ANALYZE executes, and keeps a
+        # failing statement from aborting the audit transaction
+        await tx.execute_raw("SAVEPOINT audit_explain")
+        try:
+            plan = await QueryAudit.explain(tx, sql, params)
+        except Exception as e:
+            return None, [f"EXPLAIN failed: {e}"]
+        finally:
+            await tx.execute_raw("ROLLBACK TO SAVEPOINT audit_explain")
+            # Prepared statements are not undone by the rollback
+            if await tx.query_raw(PREPARED_SQL):
+                await tx.execute_raw("DEALLOCATE audit_statement")
+        return plan, find_problems(plan["Plan"], table_rows, allow_sort)
+
+    @staticmethod
+    async def explain(tx: Prisma, sql: str, params: list) -> dict:
+        """
+        EXPLAIN a statement with $n placeholders. It is prepared and then
+        executed with its parameters written as literals, so they take the
+        types Postgres inferred for the placeholders.
+        """
+        await tx.execute_raw(f"PREPARE audit_statement AS {sql}")
+        arguments = f"({', '.join(_literal(value) for value in params)})" if params else ""
+        rows = await tx.query_raw(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) EXECUTE audit_statement{arguments}"
+        )
+        plan = rows[0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
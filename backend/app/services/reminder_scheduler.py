@@ -0,0 +1,335 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import httpx
+from prisma import Prisma
+from prisma.models import Reminder
+from app.core.config import settings
+from app.core.database import db_pool
+from app.models.reminder import ReminderResponse
+from app.services.versions import VersionService
+
+logger = logging.getLogger(__name__)
+
+
+# Claim a batch of due reminders by leasing them into the future and return
+# them. They are only marked sent once the notifier has accepted them, so a
+# worker that dies in between leaves them to be claimed again when the
+# lease runs out. Uses the (sent, remindAt) index; SKIP LOCKED keeps
+# several workers from claiming the same reminder.
+CLAIM_DUE_SQL = """
+    UPDATE reminders
+    SET claimed_until = timezone('utc', now()) + make_interval(secs => $3::float8)
+    WHERE id IN (
+        SELECT id FROM reminders
+        WHERE sent = false
+          AND remind_at <= timezone('utc', now())
+          AND remind_at >= timezone('utc', now()) - make_interval(secs => $2::float8)
+          AND (claimed_until IS NULL OR claimed_until <= timezone('utc', now()))
+        ORDER BY remind_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, deal_id, type::text AS type, title, remind_at, created_at
+"""
+
+# How long a claimed batch stays invisible to other workers
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Backoff after a failed dispatch: RETRY_BASE doubled per consecutive failure
+RETRY_BASE = timedelta(seconds=5)
+MAX_RETRY_DELAY = timedelta(minutes=5)
+
+
+class LogNotifier:
+    """Logs dispatched reminders. The default until a real channel is configured."""
+
+    async def send(self, reminders: List[ReminderResponse]) -> None:
+        for reminder in reminders:
+            logger.info(
+                "Reminder %s for user %s: %s", reminder.id, reminder.user_id, reminder.title
+            )
+
+
+class MemoryNotifier:
+    """Keeps dispatched reminders in memory, for local testing."""
+
+    def __init__(self):
+        self.sent: List[ReminderResponse] = []
+
+    async def send(self, reminders: List[ReminderResponse]) -> None:
+        self.sent.extend(reminders)
+
+
+class WebhookNotifier:
+    """POSTs each batch of reminders as a JSON array to a webhook URL."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, reminders: List[ReminderResponse]) -> None:
+        payload = [r.model_dump(by_alias=True, mode="json") for r in reminders]
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json=payload)
+            response.raise_for_status()
+
+
+def create_notifier(name: Optional[str] = None):
+    """Build the notifier selected by REMINDER_NOTIFIER."""
+    name = name or settings.REMINDER_NOTIFIER
+    if name == "log":
+        return LogNotifier()
+    if name == "memory":
+        return MemoryNotifier()
+    if name == "webhook":
+        if not settings.REMINDER_WEBHOOK_URL:
+            raise RuntimeError("REMINDER_NOTIFIER=webhook requires REMINDER_WEBHOOK_URL")
+        return WebhookNotifier(settings.REMINDER_WEBHOOK_URL)
+    raise RuntimeError(
+        f"Unknown REMINDER_NOTIFIER '{name}', expected 'log', 'memory' or 'webhook'"
+    )
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ReminderScheduler:
+    """
+    Dispatches reminders when they fall due.
+
+    Only reminders due within `horizon` are held in memory, in a min-heap of
+    (remindAt, id) that is refilled from the (sent, remindAt) index every
+    horizon/2, so the number of pending reminders in the table does not
+    matter. The heap only decides when to wake up; the database claim is
+    authoritative, so entries left behind by updates and deletes just cause
+    an extra wake-up. Due entries that could not be claimed (leased by
+    another worker) are retried when the lease runs out, and a failed
+    dispatch is retried with exponential backoff. ReminderService calls schedule()/unschedule() so
+    changes made through this process take effect immediately; changes
+    made by other processes are picked up on the next refill.
+    """
+
+    def __init__(
+        self,
+        notifier,
+        horizon: float,
+        batch_size: int,
+        max_age: float,
+        max_loaded: int = 100000,
+        lease: timedelta = CLAIM_LEASE
+    ):
+        self.notifier = notifier
+        self.lease = lease
+        self.horizon = timedelta(seconds=horizon)
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.max_loaded = max_loaded
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._next_refill = _utcnow()
+        self._failures = 0
+
+        self.dispatched_total = 0
+        self.failed_total = 0
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._next_refill = _utcnow()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def schedule(self, reminder: Reminder) -> None:
+        """Track a created or updated reminder if it is due within the horizon."""
+        if self._task is None:
+            return
+        if reminder.sent:
+            self.unschedule(reminder.id)
+            return
+
+        remind_at = _as_utc(reminder.remindAt)
+        if remind_at > _utcnow() + self.horizon:
+            self.unschedule(reminder.id)
+            return
+
+        self._scheduled[reminder.id] = remind_at
+        heapq.heappush(self._heap, (remind_at, reminder.id))
+        if self._heap[0] == (remind_at, reminder.id):
+            # New earliest entry, re-evaluate the sleep
+            self._wakeup.set()
+
+    def unschedule(self, reminder_id: int) -> None:
+        """Forget a reminder; its heap entry is skipped lazily."""
+        self._scheduled.pop(reminder_id, None)
+
+    def _next_due(self) -> Optional[datetime]:
+        # Drop entries superseded by an update or delete
+        while self._heap:
+            remind_at, reminder_id = self._heap[0]
+            if self._scheduled.get(reminder_id) == remind_at:
+                return remind_at
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        """Remove and return the ids still scheduled at or before `now`."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            remind_at, reminder_id = heapq.heappop(self._heap)
+            if self._scheduled.get(reminder_id) == remind_at:
+                del self._scheduled[reminder_id]
+                due.append(reminder_id)
+        return due
+
+    def _defer(self, reminder_ids: List[int], until: datetime) -> None:
+        """Wake up for these reminders again at `until`."""
+        for reminder_id in reminder_ids:
+            self._scheduled[reminder_id] = until
+            heapq.heappush(self._heap, (until, reminder_id))
+
+    def _retry_delay(self) -> timedelta:
+        return min(RETRY_BASE * 2 ** self._failures, MAX_RETRY_DELAY)
+
+    async def refill(self, db: Prisma) -> None:
+        """Reload unsent reminders due within the horizon."""
+        now = _utcnow()
+        rows = await db.reminder.find_many(
+            where={
+                "sent": False,
+                "remindAt": {
+                    "gte": now - timedelta(seconds=self.max_age),
+                    "lte": now + self.horizon
+                }
+            },
+            order=[{"remindAt": "asc"}],
+            take=self.max_loaded
+        )
+        self._heap = []
+        self._scheduled = {}
+        for row in rows:
+            remind_at = _as_utc(row.remindAt)
+            self._scheduled[row.id] = remind_at
+            self._heap.append((remind_at, row.id))
+        heapq.heapify(self._heap)
+
+    async def dispatch_due(self, db: Prisma) -> int:
+        """
+        Claim one batch of due reminders, hand them to the notifier and
+        mark them sent once it succeeds. If the notifier fails, the claim is
+        extended by the retry delay and the reminders are rescheduled for
+        then. If this process dies first, the lease expires and any worker
+        sends them again, so delivery is at least once. Returns the number
+        claimed.
+        """
+        rows = await db.query_raw(
+            CLAIM_DUE_SQL, self.batch_size, self.max_age, self.lease.total_seconds()
+        )
+        if not rows:
+            return 0
+
+        reminders = [
+            ReminderResponse(
+                id=row["id"],
+                userId=row["user_id"],
+                dealId=row["deal_id"],
+                type=row["type"],
+                title=row["title"],
+                remindAt=row["remind_at"],
+                # As they will read once delivered
+                sent=True,
+                createdAt=row["created_at"]
+            )
+            for row in rows
+        ]
+        ids = [r.id for r in reminders]
+        try:
+            await self.notifier.send(reminders)
+        except Exception:
+            logger.exception("Reminder notifier failed for %d reminder(s)", len(reminders))
+            self.failed_total += len(reminders)
+            retry_at = _utcnow() + self._retry_delay()
+            self._failures += 1
+            self._defer(ids, retry_at)
+            await db.reminder.update_many(
+                where={"id": {"in": ids}},
+                data={"claimedUntil": retry_at}
+            )
+            raise
+
+        await db.reminder.update_many(
+            where={"id": {"in": ids}},
+            data={"sent": True, "claimedUntil": None}
+        )
+        # Flipping `sent` changed the owners' reminder lists
+        await VersionService.bump_users(db, {r.user_id for r in reminders}, "reminders")
+
+        for reminder_id in ids:
+            self.unschedule(reminder_id)
+        self._failures = 0
+        self.dispatched_total += len(reminders)
+        return len(reminders)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            now = _utcnow()
+            try:
+                async with db_pool.session() as db:
+                    if now >= self._next_refill:
+                        await self.refill(db)
+                        self._next_refill = now + self.horizon / 2
+
+                    next_due = self._next_due()
+                    if next_due is not None and next_due <= now:
+                        claimed = await self.dispatch_due(db)
+                        if claimed >= self.batch_size:
+                            # More may be waiting, go again without sleeping
+                            continue
+                        # Everything claimable was claimed; the rest is leased
+                        # by another worker, or already sent or deleted
+                        self._defer(self._pop_due(now), now + self.lease)
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                self._defer(self._pop_due(now), now + self._retry_delay())
+
+            wake_at = self._next_refill
+            next_due = self._next_due()
+            if next_due is not None:
+                wake_at = min(wake_at, next_due)
+            timeout = max((wake_at - _utcnow()).total_seconds(), 0.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._scheduled),
+            "dispatched_total": self.dispatched_total,
+            "failed_total": self.failed_total,
+        }
+
+
+# Global instance
+reminder_scheduler = ReminderScheduler(
+    notifier=create_notifier(),
+    horizon=settings.REMINDER_HORIZON,
+    batch_size=settings.REMINDER_BATCH_SIZE,
+    max_age=settings.REMINDER_MAX_AGE,
+)
@@ -1,17 +1,30 @@
 from prisma import Prisma
 from app.models.reminder import ReminderCreate, ReminderUpdate
-from typing import List, Optional
+from app.services.deals import BATCH_TX_TIMEOUT
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.versions import VersionService
+from app.services.pagination import (
+    Page, build_page, keyset_order, keyset_take, keyset_where
+)
+from typing import List, Optional, Tuple
 from prisma.models import Reminder
 
 
 class ReminderService:
     @staticmethod
-    async def get_reminders(db: Prisma, user_id: str) -> List[Reminder]:
-        """Get all reminders for a user."""
-        return await db.reminder.find_many(
-            where={"userId": user_id},
-            order=[{"remindAt": "desc"}]
+    async def get_reminders(
+        db: Prisma,
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Page[Reminder]:
+        """Get a page of reminders for a user, latest remindAt first."""
+        rows = await db.reminder.find_many(
+            where={"userId": user_id, **keyset_where("remindAt", cursor)},
+            order=keyset_order("remindAt"),
+            take=keyset_take(limit)
         )
+        return build_page(rows, limit, "remindAt")
     
     @staticmethod
     async def get_reminder(
@@ -41,7 +54,11 @@ class ReminderService:
         from prisma.enums import ReminderType
         reminder_dict["type"] = ReminderType(reminder_dict["type"])
         
-        return await db.reminder.create(data=reminder_dict)
+        async with db.tx() as tx:
+            reminder = await tx.reminder.create(data=reminder_dict)
+            await VersionService.bump(tx, user_id, "reminders")
+        reminder_scheduler.schedule(reminder)
+        return reminder
     
     @staticmethod
     async def update_reminder(
@@ -51,11 +68,6 @@ class ReminderService:
         reminder_data: ReminderUpdate
     ) -> Optional[Reminder]:
         """Update a reminder, ensuring it belongs to the user."""
-        # Check if reminder exists and belongs to user
-        existing = await ReminderService.get_reminder(db, reminder_id, user_id)
-        if not existing:
-            return None
-        
         # Convert update data
         update_dict = reminder_data.model_dump(by_alias=True, exclude_none=True)
         
@@ -64,18 +76,122 @@ class ReminderService:
             from prisma.enums import ReminderType
             update_dict["type"] = ReminderType(update_dict["type"])
         
-        return await db.reminder.update(
-            where={"id": reminder_id},
-            data=update_dict
-        )
+        async with db.tx() as tx:
+            # Check if reminder exists and belongs to user
+            existing = await ReminderService.get_reminder(tx, reminder_id, user_id)
+            if not existing:
+                return None
+            
+            reminder = await tx.reminder.update(
+                where={"id": reminder_id},
+                data=update_dict
+            )
+            await VersionService.bump(tx, user_id, "reminders")
+        reminder_scheduler.schedule(reminder)
+        return reminder
     
     @staticmethod
     async def delete_reminder(db: Prisma, reminder_id: int, user_id: str) -> bool:
         """Delete a reminder, ensuring it belongs to the user."""
-        existing = await ReminderService.get_reminder(db, reminder_id, user_id)
-        if not existing:
-            return False
-        
-        await db.reminder.delete(where={"id": reminder_id})
+        async with db.tx() as tx:
+            existing = await ReminderService.get_reminder(tx, reminder_id, user_id)
+            if not existing:
+                return False
+            
+            await tx.reminder.delete(where={"id": reminder_id})
+            await VersionService.bump(tx, user_id, "reminders")
+        reminder_scheduler.unschedule(reminder_id)
         return True
-
+    
+    @staticmethod
+    async def create_reminders(
+        db: Prisma,
+        user_id: str,
+        reminders: List[ReminderCreate]
+    ) -> List[Optional[Reminder]]:
+        """
+        Create many reminders in one transaction. Linked deals are checked
+        with a single query; returns one entry per reminder, None where the
+        linked deal is not the user's.
+        """
+        from prisma.enums import ReminderType
+        
+        deal_ids = {r.deal_id for r in reminders if r.deal_id}
+        created = []
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            owned = set()
+            if deal_ids:
+                deals = await tx.deal.find_many(
+                    where={"id": {"in": list(deal_ids)}, "userId": user_id}
+                )
+                owned = {deal.id for deal in deals}
+            
+            for reminder_data in reminders:
+                if reminder_data.deal_id and reminder_data.deal_id not in owned:
+                    created.append(None)
+                    continue
+                reminder_dict = reminder_data.model_dump(by_alias=True, exclude_none=True)
+                reminder_dict["userId"] = user_id
+                reminder_dict["type"] = ReminderType(reminder_dict["type"])
+                created.append(await tx.reminder.create(data=reminder_dict))
+            if any(created):
+                await VersionService.bump(tx, user_id, "reminders")
+        
+        for reminder in created:
+            if reminder:
+                reminder_scheduler.schedule(reminder)
+        return created
+    
+    @staticmethod
+    async def update_reminders(
+        db: Prisma,
+        user_id: str,
+        updates: List[Tuple[int, ReminderUpdate]]
+    ) -> List[Optional[Reminder]]:
+        """Update many reminders in one transaction; None where the reminder is not the user's."""
+        from prisma.enums import ReminderType
+        
+        updated: List[Optional[Reminder]] = [None] * len(updates)
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            existing = await tx.reminder.find_many(
+                where={"id": {"in": list({reminder_id for reminder_id, _ in updates})}, "userId": user_id}
+            )
+            owned = {reminder.id for reminder in existing}
+            
+            for index in sorted(range(len(updates)), key=lambda i: updates[i][0]):
+                reminder_id, reminder_data = updates[index]
+                if reminder_id not in owned:
+                    continue
+                update_dict = reminder_data.model_dump(by_alias=True, exclude_none=True, exclude={"id"})
+                if "type" in update_dict:
+                    update_dict["type"] = ReminderType(update_dict["type"])
+                updated[index] = await tx.reminder.update(
+                    where={"id": reminder_id},
+                    data=update_dict
+                )
+            if any(updated):
+                await VersionService.bump(tx, user_id, "reminders")
+        
+        for reminder in updated:
+            if reminder:
+                reminder_scheduler.schedule(reminder)
+        return updated
+    
+    @staticmethod
+    async def delete_reminders(db: Prisma, user_id: str, reminder_ids: List[int]) -> List[bool]:
+        """
+        Delete many reminders with one ownership query and one DELETE, in
+        one transaction. Returns whether each id was deleted; a repeated id
+        is reported like its first occurrence.
+        """
+        async with db.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            existing = await tx.reminder.find_many(
+                where={"id": {"in": list(set(reminder_ids))}, "userId": user_id}
+            )
+            owned = {reminder.id for reminder in existing}
+            if owned:
+                await tx.reminder.delete_many(where={"id": {"in": list(owned)}, "userId": user_id})
+                await VersionService.bump(tx, user_id, "reminders")
+        for reminder_id in owned:
+            reminder_scheduler.unschedule(reminder_id)
+        return [reminder_id in owned for reminder_id in reminder_ids]
@@ -0,0 +1,279 @@
+"""
+Per-user financial rollups and the lock order that keeps mutations of them
+deadlock-free. Every transaction that changes deals or payments takes its
+row locks in one order: deal rows in id order (a payment is only changed
+while its deal's row is locked), then deal_rollups by sorted status, then
+payment_rollups, then user_versions by sorted resource. Services collect
+rollup changes in a RollupDeltas and apply them last with
+RollupService.apply_deltas.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from prisma import Prisma
+from prisma.enums import DealStatus
+
+
+DEAL_DELTA_SQL = """
+    INSERT INTO deal_rollups (user_id, status, deal_count, total_value)
+    VALUES ($1, $2::"DealStatus", $3, $4::numeric)
+    ON CONFLICT (user_id, status) DO UPDATE
+    SET deal_count = deal_rollups.deal_count + EXCLUDED.deal_count,
+        total_value = deal_rollups.total_value + EXCLUDED.total_value
+"""
+
+DEAL_PAYMENT_TOTALS_SQL = """
+    SELECT paid, COUNT(*)::int AS count, COALESCE(SUM(amount), 0)::text AS total
+    FROM payments
+    WHERE deal_id = $1
+    GROUP BY paid
+"""
+
+PAYMENT_DELTA_SQL = """
+    INSERT INTO payment_rollups (user_id, paid_total, outstanding_total, paid_count, outstanding_count)
+    VALUES ($1, $2::numeric, $3::numeric, $4, $5)
+    ON CONFLICT (user_id) DO UPDATE
+    SET paid_total = payment_rollups.paid_total + EXCLUDED.paid_total,
+        outstanding_total = payment_rollups.outstanding_total + EXCLUDED.outstanding_total,
+        paid_count = payment_rollups.paid_count + EXCLUDED.paid_count,
+        outstanding_count = payment_rollups.outstanding_count + EXCLUDED.outstanding_count
+"""
+
+# Source-of-truth aggregates, used by rebuild and verify.
+# $1 is an optional user id; NULL means every user.
+EXPECTED_DEAL_ROLLUPS_SQL = """
+    SELECT user_id, status, COUNT(*)::int AS deal_count, SUM(deal_value) AS total_value
+    FROM deals
+    WHERE $1::text IS NULL OR user_id = $1
+    GROUP BY user_id, status
+"""
+
+EXPECTED_PAYMENT_ROLLUPS_SQL = """
+    SELECT d.user_id,
+           COALESCE(SUM(p.amount) FILTER (WHERE p.paid), 0) AS paid_total,
+           COALESCE(SUM(p.amount) FILTER (WHERE NOT p.paid), 0) AS outstanding_total,
+           COUNT(*) FILTER (WHERE p.paid)::int AS paid_count,
+           COUNT(*) FILTER (WHERE NOT p.paid)::int AS outstanding_count
+    FROM payments p
+    JOIN deals d ON d.id = p.deal_id
+    WHERE $1::text IS NULL OR d.user_id = $1
+    GROUP BY d.user_id
+"""
+
+DEAL_DRIFT_SQL = f"""
+    SELECT COALESCE(e.user_id, r.user_id) AS user_id,
+           COALESCE(e.status, r.status)::text AS status,
+           COALESCE(e.deal_count, 0) AS expected_count,
+           COALESCE(r.deal_count, 0) AS actual_count,
+           COALESCE(e.total_value, 0)::text AS expected_value,
+           COALESCE(r.total_value, 0)::text AS actual_value
+    FROM ({EXPECTED_DEAL_ROLLUPS_SQL}) e
+    FULL OUTER JOIN (
+        SELECT * FROM deal_rollups WHERE $1::text IS NULL OR user_id = $1
+    ) r ON r.user_id = e.user_id AND r.status = e.status
+    WHERE COALESCE(e.deal_count, 0) <> COALESCE(r.deal_count, 0)
+       OR COALESCE(e.total_value, 0) <> COALESCE(r.total_value, 0)
+"""
+
+PAYMENT_DRIFT_SQL = f"""
+    SELECT COALESCE(e.user_id, r.user_id) AS user_id,
+           COALESCE(e.paid_total, 0)::text AS expected_paid,
+           COALESCE(r.paid_total, 0)::text AS actual_paid,
+           COALESCE(e.outstanding_total, 0)::text AS expected_outstanding,
+           COALESCE(r.outstanding_total, 0)::text AS actual_outstanding,
+           COALESCE(e.paid_count, 0) AS expected_paid_count,
+           COALESCE(r.paid_count, 0) AS actual_paid_count,
+           COALESCE(e.outstanding_count, 0) AS expected_outstanding_count,
+           COALESCE(r.outstanding_count, 0) AS actual_outstanding_count
+    FROM ({EXPECTED_PAYMENT_ROLLUPS_SQL}) e
+    FULL OUTER JOIN (
+        SELECT * FROM payment_rollups WHERE $1::text IS NULL OR user_id = $1
+    ) r ON r.user_id = e.user_id
+    WHERE COALESCE(e.paid_total, 0) <> COALESCE(r.paid_total, 0)
+       OR COALESCE(e.outstanding_total, 0) <> COALESCE(r.outstanding_total, 0)
+       OR COALESCE(e.paid_count, 0) <> COALESCE(r.paid_count, 0)
+       OR COALESCE(e.outstanding_count, 0) <> COALESCE(r.outstanding_count, 0)
+"""
+
+
+def _enum_value(value) -> str:
+    return getattr(value, "value", value)
+
+
+class RollupDeltas:
+    """Rollup changes collected during a transaction, merged per rollup row."""
+    __slots__ = ("deals", "payments")
+
+    def __init__(self):
+        # status -> (count, value)
+        self.deals: Dict[str, Tuple[int, Decimal]] = {}
+        # paid -> (count, amount)
+        self.payments: Dict[bool, Tuple[int, Decimal]] = {}
+
+    def add_deal(self, status: str, count: int, value: Decimal) -> None:
+        key = _enum_value(status)
+        old_count, old_value = self.deals.get(key, (0, Decimal("0")))
+        self.deals[key] = (old_count + count, old_value + value)
+
+    def add_payment(self, paid: bool, count: int, amount: Decimal) -> None:
+        old_count, old_amount = self.payments.get(paid, (0, Decimal("0")))
+        self.payments[paid] = (old_count + count, old_amount + amount)
+
+
+class RollupService:
+    """Per-user deal and payment totals, kept up to date inside each mutation's transaction."""
+
+    @staticmethod
+    async def lock_row(tx: Prisma, table: str, row_id: int) -> None:
+        """Lock a row for the rest of the transaction."""
+        await tx.query_raw(f"SELECT id FROM {table} WHERE id = $1 FOR UPDATE", row_id)
+
+    @staticmethod
+    async def apply_deal_delta(
+        tx: Prisma,
+        user_id: str,
+        status: str,
+        count: int,
+        value: Decimal
+    ) -> None:
+        """Add count/value to the user's rollup for one deal status."""
+        await tx.execute_raw(DEAL_DELTA_SQL, user_id, _enum_value(status), count, str(value))
+
+    @staticmethod
+    async def apply_payment_delta(
+        tx: Prisma,
+        user_id: str,
+        paid: bool,
+        count: int,
+        amount: Decimal
+    ) -> None:
+        """Add count/amount to the user's paid or outstanding payment totals."""
+        zero = Decimal("0")
+        await tx.execute_raw(
+            PAYMENT_DELTA_SQL,
+            user_id,
+            str(amount if paid else zero),
+            str(zero if paid else amount),
+            count if paid else 0,
+            0 if paid else count
+        )
+
+    @staticmethod
+    async def apply_deltas(tx: Prisma, user_id: str, deltas: RollupDeltas) -> None:
+        """Apply collected deltas; call after every deal and payment row has been locked."""
+        for status in sorted(deltas.deals):
+            count, value = deltas.deals[status]
+            if count or value:
+                await RollupService.apply_deal_delta(tx, user_id, status, count, value)
+
+        paid_count, paid_total = deltas.payments.get(True, (0, Decimal("0")))
+        outstanding_count, outstanding_total = deltas.payments.get(False, (0, Decimal("0")))
+        if paid_count or paid_total or outstanding_count or outstanding_total:
+            await tx.execute_raw(
+                PAYMENT_DELTA_SQL,
+                user_id,
+                str(paid_total),
+                str(outstanding_total),
+                paid_count,
+                outstanding_count
+            )
+
+    @staticmethod
+    async def remove_deal_payments(tx: Prisma, deal_id: int, deltas: RollupDeltas) -> None:
+        """Subtract a deal's payments before the deal is deleted; the caller holds the deal lock."""
+        rows = await tx.query_raw(DEAL_PAYMENT_TOTALS_SQL, deal_id)
+        for row in rows:
+            deltas.add_payment(bool(row["paid"]), -row["count"], -Decimal(str(row["total"])))
+
+    @staticmethod
+    async def get_rollups(db: Prisma, user_id: str) -> dict:
+        """Read a user's rollups, with zero totals for statuses the user has no deals in."""
+        deal_rows, payment_row = await asyncio.gather(
+            db.dealrollup.find_many(where={"userId": user_id}),
+            db.paymentrollup.find_unique(where={"userId": user_id}),
+        )
+
+        by_status = {_enum_value(row.status): row for row in deal_rows}
+        pipeline = []
+        for deal_status in DealStatus:
+            row = by_status.get(deal_status.value)
+            pipeline.append({
+                "status": deal_status.value,
+                "count": row.dealCount if row else 0,
+                "totalValue": row.totalValue if row else Decimal("0"),
+            })
+
+        return {
+            "pipeline": pipeline,
+            "payments": {
+                "paid": payment_row.paidTotal if payment_row else Decimal("0"),
+                "outstanding": payment_row.outstandingTotal if payment_row else Decimal("0"),
+                "paidCount": payment_row.paidCount if payment_row else 0,
+                "outstandingCount": payment_row.outstandingCount if payment_row else 0,
+            },
+        }
+
+    @staticmethod
+    async def rebuild(db: Prisma, user_id: Optional[str] = None) -> None:
+        """Recompute rollups from the deals and payments tables."""
+        async with db.tx(timeout=timedelta(minutes=10)) as tx:
+            await tx.execute_raw(
+                "DELETE FROM deal_rollups WHERE $1::text IS NULL OR user_id = $1",
+                user_id
+            )
+            await tx.execute_raw(
+                "DELETE FROM payment_rollups WHERE $1::text IS NULL OR user_id = $1",
+                user_id
+            )
+            await tx.execute_raw(
+                "INSERT INTO deal_rollups (user_id, status, deal_count, total_value) "
+                f"SELECT * FROM ({EXPECTED_DEAL_ROLLUPS_SQL}) e",
+                user_id
+            )
+            await tx.execute_raw(
+                "INSERT INTO payment_rollups "
+                "(user_id, paid_total, outstanding_total, paid_count, outstanding_count) "
+                f"SELECT * FROM ({EXPECTED_PAYMENT_ROLLUPS_SQL}) e",
+                user_id
+            )
+
+    @staticmethod
+    async def verify(db: Prisma, user_id: Optional[str] = None) -> List[dict]:
+        """Compare stored rollups with a recomputation; returns one entry per drifted row."""
+        deal_drift = await db.query_raw(DEAL_DRIFT_SQL, user_id)
+        payment_drift = await db.query_raw(PAYMENT_DRIFT_SQL, user_id)
+        return (
+            [{"kind": "deal", **row} for row in deal_drift]
+            + [{"kind": "payment", **row} for row in payment_drift]
+        )
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Verify or rebuild per-user financial rollups."
+    )
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user", dest="user_id", default=None, help="Limit to one user ID")
+    args = parser.parse_args(argv)
+
+    db = Prisma()
+    await db.connect()
+    try:
+        if args.command == "rebuild":
+            await RollupService.rebuild(db, args.user_id)
+            print("Rollups rebuilt")
+
+        drift = await RollupService.verify(db, args.user_id)
+        for row in drift:
+            print(row)
+        print(f"{len(drift)} drifted rollup row(s)")
+        return 1 if drift else 0
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
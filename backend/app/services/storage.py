@@ -1,18 +1,78 @@
-from supabase import create_client, Client
 from app.core.config import settings
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+import abc
+import anyio
+import asyncio
+import httpx
+import os
+import tempfile
 import uuid
-from typing import Optional
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
 
 
-class SupabaseStorageService:
-    def __init__(self):
-        self.client: Client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_ROLE_KEY
-        )
-        self.bucket_name = "contracts"
-    
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+PDF_MAGIC = b"%PDF-"
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+async def iter_validated_chunks(
+    file: UploadFile,
+    max_size: int = MAX_UPLOAD_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Read an upload chunk by chunk, checking the PDF magic bytes on the first
+    chunk and raising ValueError as soon as the running size exceeds max_size.
+    At most one chunk is held in memory at a time.
+    """
+    total = 0
+    first = True
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+
+        if first:
+            if not chunk.startswith(PDF_MAGIC):
+                raise ValueError("Only PDF files are allowed")
+            first = False
+
+        total += len(chunk)
+        if total > max_size:
+            raise ValueError("File size exceeds 10MB limit")
+
+        yield chunk
+
+    if first:
+        raise ValueError("File is empty")
+
+
+async def _discard(fh, path: str) -> None:
+    """Close and delete a local file, even while the task is being cancelled."""
+    with anyio.CancelScope(shield=True):
+        await run_in_threadpool(fh.close)
+        await run_in_threadpool(os.unlink, path)
+
+
+def storage_path_from_url(file_url: str) -> str:
+    """Extract the object path from a public contract URL."""
+    # URL format: https://[project].supabase.co/storage/v1/object/public/contracts/[path]
+    return file_url.split("/contracts/")[-1] if "/contracts/" in file_url else file_url
+
+
+class StorageService(abc.ABC):
+    """
+    Contract file storage. Uploads are streamed through iter_validated_chunks
+    into a backend-specific writer; subclasses implement _write, _remove,
+    list_files and get_public_url, without blocking the event loop.
+    """
+    bucket_name = "contracts"
+
     async def upload_file(
         self,
         file: UploadFile,
@@ -20,67 +80,283 @@ class SupabaseStorageService:
         user_id: str
     ) -> str:
         """
-        Upload a file to Supabase Storage and return the public URL.
-        
+        Upload a file to storage and return the public URL.
+
         Args:
             file: FastAPI UploadFile object
             deal_id: ID of the deal this contract belongs to
             user_id: ID of the user (for organization)
-        
+
         Returns:
             Public URL of the uploaded file
         """
+        # Validate declared file type before reading anything
+        if file.content_type != "application/pdf":
+            raise ValueError("Only PDF files are allowed")
+
         # Generate unique filename
         file_extension = file.filename.split(".")[-1] if "." in file.filename else "pdf"
         unique_filename = f"{user_id}/{deal_id}/{uuid.uuid4()}.{file_extension}"
-        
-        # Read file content
-        file_content = await file.read()
-        
-        # Validate file type (only PDFs)
-        if file.content_type != "application/pdf":
-            raise ValueError("Only PDF files are allowed")
-        
-        # Validate file size (10MB limit)
-        if len(file_content) > 10 * 1024 * 1024:
-            raise ValueError("File size exceeds 10MB limit")
-        
-        # Upload to Supabase Storage
-        response = self.client.storage.from_(self.bucket_name).upload(
-            path=unique_filename,
-            file=file_content,
-            file_options={"content-type": "application/pdf"}
-        )
-        
-        # Get public URL
-        public_url = self.client.storage.from_(self.bucket_name).get_public_url(
-            unique_filename
-        )
-        
-        return public_url
-    
+
+        await self._write(unique_filename, iter_validated_chunks(file))
+        return self.get_public_url(unique_filename)
+
     async def delete_file(self, file_url: str) -> bool:
         """
-        Delete a file from Supabase Storage.
-        
+        Delete a file from storage.
+
         Args:
             file_url: Public URL of the file to delete
-        
+
         Returns:
             True if deleted successfully
         """
         try:
-            # Extract file path from URL
-            # URL format: https://[project].supabase.co/storage/v1/object/public/contracts/[path]
-            path = file_url.split("/contracts/")[-1] if "/contracts/" in file_url else file_url
-            
-            # Delete from storage
-            self.client.storage.from_(self.bucket_name).remove([path])
+            await self._remove([storage_path_from_url(file_url)])
             return True
         except Exception:
             return False
 
+    async def delete_files(self, paths: List[str]) -> None:
+        """Delete several objects in one call. Raises on failure."""
+        if paths:
+            await self._remove(paths)
 
-# Global instance
-storage_service = SupabaseStorageService()
+    @abc.abstractmethod
+    async def list_files(self, prefix: str) -> List[Tuple[str, datetime]]:
+        """
+        List objects directly under a folder prefix (e.g. "{user_id}/{deal_id}"),
+        returning (path, created_at) pairs. Sub-folders are returned with a
+        trailing slash and their own listing time.
+        """
+
+    @abc.abstractmethod
+    async def _write(self, path: str, chunks: AsyncIterator[bytes]) -> None:
+        """Store the chunks as the object at `path`."""
+
+    @abc.abstractmethod
+    async def _remove(self, paths: List[str]) -> None:
+        """Delete the objects at `paths`. Raises on failure."""
+
+    @abc.abstractmethod
+    def get_public_url(self, path: str) -> str:
+        """Public URL of the object at `path`."""
+
+    async def aclose(self) -> None:
+        """Release any network resources held by the backend."""
 
+
+class SupabaseStorageService(StorageService):
+    """
+    Talks to the Supabase Storage REST API with a shared httpx.AsyncClient,
+    so transfers never block the event loop and connections are reused.
+    Requests are retried with exponential backoff on transport errors and
+    retryable status codes.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        service_key: str,
+        timeout: float,
+        max_connections: int,
+        max_retries: int,
+        retry_backoff: float
+    ):
+        self.base_url = f"{url.rstrip('/')}/storage/v1"
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._headers = {
+            "Authorization": f"Bearer {service_key}",
+            "apikey": service_key,
+        }
+        self._timeout = httpx.Timeout(timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the running event loop
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=self._timeout,
+                limits=self._limits
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _request(self, method: str, url: str, content_factory=None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transient failures. content_factory is
+        called once per attempt so a streamed body can be replayed.
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                if content_factory is not None:
+                    kwargs["content"] = content_factory()
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    response.raise_for_status()
+                    return response
+
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def _write(self, path: str, chunks: AsyncIterator[bytes]) -> None:
+        # Spool to a temp file so memory stays at one chunk per upload and
+        # the body can be replayed if the request has to be retried.
+        tmp = await run_in_threadpool(tempfile.NamedTemporaryFile, suffix=".pdf", delete=False)
+        try:
+            size = 0
+            async for chunk in chunks:
+                await run_in_threadpool(tmp.write, chunk)
+                size += len(chunk)
+            await run_in_threadpool(tmp.close)
+
+            async def read_file() -> AsyncIterator[bytes]:
+                fh = await run_in_threadpool(open, tmp.name, "rb")
+                try:
+                    while True:
+                        chunk = await run_in_threadpool(fh.read, UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        yield chunk
+                finally:
+                    await run_in_threadpool(fh.close)
+
+            await self._request(
+                "POST",
+                f"{self.base_url}/object/{self.bucket_name}/{path}",
+                content_factory=read_file,
+                headers={
+                    "Content-Type": "application/pdf",
+                    "Content-Length": str(size),
+                    "x-upsert": "false",
+                }
+            )
+        finally:
+            await _discard(tmp, tmp.name)
+
+    async def _remove(self, paths: List[str]) -> None:
+        await self._request(
+            "DELETE",
+            f"{self.base_url}/object/{self.bucket_name}",
+            json={"prefixes": paths}
+        )
+
+    async def list_files(self, prefix: str) -> List[Tuple[str, datetime]]:
+        prefix = prefix.strip("/")
+        results = []
+        offset = 0
+        page_size = 1000
+        while True:
+            response = await self._request(
+                "POST",
+                f"{self.base_url}/object/list/{self.bucket_name}",
+                json={"prefix": prefix, "limit": page_size, "offset": offset}
+            )
+            entries = response.json()
+            for entry in entries:
+                path = f"{prefix}/{entry['name']}" if prefix else entry["name"]
+                if entry.get("id") is None:
+                    # Folders have no object id
+                    results.append((path + "/", datetime.now(timezone.utc)))
+                else:
+                    created = datetime.fromisoformat(entry["created_at"].replace("Z", "+00:00"))
+                    results.append((path, created))
+            if len(entries) < page_size:
+                return results
+            offset += page_size
+
+    def get_public_url(self, path: str) -> str:
+        return f"{self.base_url}/object/public/{self.bucket_name}/{path}"
+
+
+class LocalStorageService(StorageService):
+    """
+    Stores contracts on the local filesystem, for development and offline
+    tests. File operations run in the thread pool.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, self.bucket_name, path))
+        if not full_path.startswith(os.path.join(self.root, self.bucket_name) + os.sep):
+            raise ValueError("Invalid storage path")
+        return full_path
+
+    async def _write(self, path: str, chunks: AsyncIterator[bytes]) -> None:
+        full_path = self._full_path(path)
+        await run_in_threadpool(os.makedirs, os.path.dirname(full_path), exist_ok=True)
+
+        fh = await run_in_threadpool(open, full_path, "wb")
+        try:
+            async for chunk in chunks:
+                await run_in_threadpool(fh.write, chunk)
+        except BaseException:
+            await _discard(fh, full_path)
+            raise
+        await run_in_threadpool(fh.close)
+
+    async def _remove(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                await run_in_threadpool(os.unlink, self._full_path(path))
+            except FileNotFoundError:
+                pass
+
+    async def list_files(self, prefix: str) -> List[Tuple[str, datetime]]:
+        prefix = prefix.strip("/")
+        root = os.path.join(self.root, self.bucket_name)
+        directory = os.path.join(root, prefix) if prefix else root
+
+        def scan() -> List[Tuple[str, datetime]]:
+            if not os.path.isdir(directory):
+                return []
+            results = []
+            for entry in os.scandir(directory):
+                path = f"{prefix}/{entry.name}" if prefix else entry.name
+                created = datetime.fromtimestamp(entry.stat().st_mtime, timezone.utc)
+                results.append((path + "/" if entry.is_dir() else path, created))
+            return results
+
+        return await run_in_threadpool(scan)
+
+    def get_public_url(self, path: str) -> str:
+        return f"{self.base_url}/{self.bucket_name}/{path}"
+
+
+def create_storage_service(backend: Optional[str] = None) -> StorageService:
+    """Build the storage service selected by STORAGE_BACKEND."""
+    backend = backend or settings.STORAGE_BACKEND
+    if backend == "local":
+        return LocalStorageService(settings.LOCAL_STORAGE_PATH, settings.LOCAL_STORAGE_URL)
+    if backend == "supabase":
+        return SupabaseStorageService(
+            url=settings.SUPABASE_URL,
+            service_key=settings.SUPABASE_SERVICE_ROLE_KEY,
+            timeout=settings.STORAGE_TIMEOUT,
+            max_connections=settings.STORAGE_MAX_CONNECTIONS,
+            max_retries=settings.STORAGE_MAX_RETRIES,
+            retry_backoff=settings.STORAGE_RETRY_BACKOFF
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND '{backend}', expected 'supabase' or 'local'")
+
+
+# Global instance
+storage_service = create_storage_service()
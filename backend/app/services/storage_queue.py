@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from prisma import Prisma
+from app.core.config import settings
+from app.core.database import db_pool
+from app.services.storage import StorageService, storage_path_from_url, storage_service
+
+logger = logging.getLogger(__name__)
+
+
+# Queue every file of a deal that is about to be deleted (contracts cascade)
+ENQUEUE_DEAL_FILES_SQL = """
+    INSERT INTO storage_deletions (file_url, next_attempt_at, created_at)
+    SELECT file_url, timezone('utc', now()), timezone('utc', now())
+    FROM contracts
+    WHERE deal_id = $1
+"""
+
+ENQUEUE_FILE_SQL = """
+    INSERT INTO storage_deletions (file_url, next_attempt_at, created_at)
+    VALUES ($1, timezone('utc', now()), timezone('utc', now()))
+"""
+
+# Claim a batch of due rows by leasing them into the future. SKIP LOCKED lets
+# several workers drain the queue without handing out the same row twice.
+CLAIM_BATCH_SQL = """
+    UPDATE storage_deletions
+    SET next_attempt_at = timezone('utc', now()) + make_interval(secs => $2::float8)
+    WHERE id IN (
+        SELECT id FROM storage_deletions
+        WHERE next_attempt_at <= timezone('utc', now())
+        ORDER BY next_attempt_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, file_url, attempts
+"""
+
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+# How long a claimed batch stays invisible to other workers
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+class StorageDeletionQueue:
+    """
+    Durable outbox for contract files that must be removed from storage.
+    Rows are written in the same transaction as the database delete and
+    drained in batches by StorageDeletionWorker.
+    """
+
+    @staticmethod
+    async def enqueue_deal_files(tx: Prisma, deal_id: int) -> None:
+        """Queue the files of all contracts on a deal, before the deal is deleted."""
+        await tx.execute_raw(ENQUEUE_DEAL_FILES_SQL, deal_id)
+
+    @staticmethod
+    async def enqueue(db: Prisma, file_urls: List[str]) -> None:
+        for file_url in file_urls:
+            await db.execute_raw(ENQUEUE_FILE_SQL, file_url)
+
+    @staticmethod
+    def retry_delay(attempts: int, base: float) -> timedelta:
+        """Exponential backoff, capped at MAX_RETRY_DELAY."""
+        return min(timedelta(seconds=base * 2 ** attempts), MAX_RETRY_DELAY)
+
+    @staticmethod
+    async def drain_once(
+        db: Prisma,
+        storage: StorageService,
+        batch_size: int,
+        retry_base: float
+    ) -> int:
+        """
+        Claim up to batch_size due rows and remove their files with one
+        storage call. Successful rows are deleted; on failure every row in
+        the batch is rescheduled with backoff. Returns the number claimed.
+        """
+        rows = await db.query_raw(
+            CLAIM_BATCH_SQL, batch_size, CLAIM_LEASE.total_seconds()
+        )
+        if not rows:
+            return 0
+
+        ids = [row["id"] for row in rows]
+        try:
+            await storage.delete_files([storage_path_from_url(row["file_url"]) for row in rows])
+        except Exception as e:
+            logger.warning("Storage delete of %d file(s) failed: %s", len(rows), e)
+            now = datetime.now(timezone.utc)
+            by_attempts = {}
+            for row in rows:
+                by_attempts.setdefault(row["attempts"], []).append(row["id"])
+            for attempts, group in by_attempts.items():
+                await db.storagedeletion.update_many(
+                    where={"id": {"in": group}},
+                    data={
+                        "attempts": attempts + 1,
+                        "nextAttemptAt": now + StorageDeletionQueue.retry_delay(attempts, retry_base),
+                        "lastError": str(e)[:1000],
+                    }
+                )
+            return len(rows)
+
+        await db.storagedeletion.delete_many(where={"id": {"in": ids}})
+        return len(rows)
+
+    @staticmethod
+    async def reconcile(
+        db: Prisma,
+        storage: StorageService,
+        user_id: Optional[str] = None,
+        grace: timedelta = timedelta(hours=1),
+        dry_run: bool = False
+    ) -> List[str]:
+        """
+        Find stored files under {user_id}/{deal_id}/ that no contract row
+        points at and queue them for deletion. Files newer than `grace` are
+        skipped so uploads whose contract row is not written yet are safe.
+        Returns the orphaned paths.
+        """
+        cutoff = datetime.now(timezone.utc) - grace
+        if user_id:
+            user_prefixes = [user_id]
+        else:
+            user_prefixes = [path.rstrip("/") for path, _ in await storage.list_files("") if path.endswith("/")]
+
+        orphans = []
+        for user_prefix in user_prefixes:
+            contracts = await db.contract.find_many(
+                where={"deal": {"is": {"userId": user_prefix}}}
+            )
+            known = {storage_path_from_url(c.fileUrl) for c in contracts}
+
+            for deal_folder, _ in await storage.list_files(user_prefix):
+                if not deal_folder.endswith("/"):
+                    continue
+                for path, created in await storage.list_files(deal_folder):
+                    if path.endswith("/") or path in known or created > cutoff:
+                        continue
+                    orphans.append(path)
+
+        if orphans:
+            queued = await db.storagedeletion.find_many(
+                where={"fileUrl": {"in": [storage.get_public_url(p) for p in orphans]}}
+            )
+            already = {storage_path_from_url(row.fileUrl) for row in queued}
+            orphans = [p for p in orphans if p not in already]
+
+        if orphans and not dry_run:
+            await StorageDeletionQueue.enqueue(db, [storage.get_public_url(p) for p in orphans])
+        return orphans
+
+
+class StorageDeletionWorker:
+    """Background task that drains the storage deletion queue."""
+
+    def __init__(self, storage: StorageService, batch_size: int, interval: float, retry_base: float):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_base = retry_base
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            claimed = 0
+            try:
+                async with db_pool.session() as db:
+                    claimed = await StorageDeletionQueue.drain_once(
+                        db, self.storage, self.batch_size, self.retry_base
+                    )
+            except Exception:
+                logger.exception("Storage deletion worker iteration failed")
+
+            # Keep going while full batches come back, otherwise wait
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+# Global instance
+storage_deletion_worker = StorageDeletionWorker(
+    storage=storage_service,
+    batch_size=settings.STORAGE_DELETE_BATCH_SIZE,
+    interval=settings.STORAGE_DELETE_INTERVAL,
+    retry_base=settings.STORAGE_DELETE_RETRY_BASE,
+)
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Drain the storage deletion queue or find orphaned contract files."
+    )
+    parser.add_argument("command", choices=["drain", "reconcile"])
+    parser.add_argument("--user", dest="user_id", default=None, help="Limit reconcile to one user ID")
+    parser.add_argument("--dry-run", action="store_true", help="Report orphans without queueing them")
+    args = parser.parse_args(argv)
+
+    db = Prisma()
+    await db.connect()
+    try:
+        if args.command == "drain":
+            total = 0
+            while True:
+                claimed = await StorageDeletionQueue.drain_once(
+                    db,
+                    storage_service,
+                    settings.STORAGE_DELETE_BATCH_SIZE,
+                    settings.STORAGE_DELETE_RETRY_BASE
+                )
+                total += claimed
+                if claimed < settings.STORAGE_DELETE_BATCH_SIZE:
+                    break
+            print(f"Processed {total} queued deletion(s)")
+        else:
+            orphans = await StorageDeletionQueue.reconcile(
+                db, storage_service, args.user_id, dry_run=args.dry_run
+            )
+            for path in orphans:
+                print(path)
+            action = "found" if args.dry_run else "queued"
+            print(f"{len(orphans)} orphaned file(s) {action}")
+        return 0
+    finally:
+        await db.disconnect()
+        await storage_service.aclose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
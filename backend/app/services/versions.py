@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from prisma import Prisma
+
+
+VERSIONED_RESOURCES = ("deals", "payments", "reminders")
+
+BUMP_VERSION_SQL = """
+    INSERT INTO user_versions (user_id, resource, version, updated_at)
+    VALUES ($1, $2, 1, timezone('utc', now()))
+    ON CONFLICT (user_id, resource) DO UPDATE
+    SET version = user_versions.version + 1,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+class VersionService:
+    """
+    Per-user version stamps for the deals, payments and reminders lists.
+    Mutations bump the stamp of every list they change, inside their own
+    transaction, so a conditional GET only needs a primary-key lookup to
+    tell whether a cached response is still current.
+    """
+
+    @staticmethod
+    async def bump(tx: Prisma, user_id: str, *resources: str) -> None:
+        """Bump one or more stamps; call this last in a transaction."""
+        for resource in sorted(set(resources)):
+            await tx.execute_raw(BUMP_VERSION_SQL, user_id, resource)
+
+    @staticmethod
+    async def bump_users(db: Prisma, user_ids: Iterable[str], resource: str) -> None:
+        """Bump one stamp for several users, e.g. after a background job."""
+        for user_id in sorted(set(user_ids)):
+            await db.execute_raw(BUMP_VERSION_SQL, user_id, resource)
+
+    @staticmethod
+    async def get_version(
+        db: Prisma,
+        user_id: str,
+        resource: str
+    ) -> Tuple[int, Optional[datetime]]:
+        """Current (version, last change) of a list; (0, None) if it never changed."""
+        row = await db.userversion.find_unique(
+            where={"userId_resource": {"userId": user_id, "resource": resource}}
+        )
+        if not row:
+            return 0, None
+        return row.version, row.updatedAt
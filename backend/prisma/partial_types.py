@@ -0,0 +1,6 @@
+# Partial models generated into prisma.partials by `prisma generate`.
+# Querying through a partial selects only its columns.
+from prisma.models import Deal
+
+# Deal without the unbounded notes column, for sparse fieldsets that leave it out
+Deal.create_partial("DealWithoutNotes", exclude={"notes"})
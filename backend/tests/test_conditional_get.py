@@ -0,0 +1,85 @@
+"""
+Conditional list GETs: the ETag follows the user's version stamp, a
+matching If-None-Match is answered with 304 after one lookup, and the
+validators never let one user's ETag match another user's response.
+"""
+from typing import Optional
+
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+
+from app.api.deps import check_conditional
+from conftest import CREATED_AT, USER_ID
+
+pytestmark = pytest.mark.anyio
+
+
+def make_request(if_none_match: Optional[str] = None, query: str = "limit=10") -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/deals",
+        "query_string": query.encode(),
+        "headers": headers,
+    })
+
+
+def stamp(version: int) -> dict:
+    return {"userId": USER_ID, "resource": "deals", "version": version, "updatedAt": CREATED_AT}
+
+
+async def conditional(db, user_id: str = USER_ID, **request) -> dict:
+    return await check_conditional(make_request(**request), Response(), db, user_id, ("deals",))
+
+
+async def test_validators(db, engine):
+    engine.responses["findUniqueUserVersion"] = stamp(3)
+
+    headers = await conditional(db)
+
+    assert headers["ETag"].startswith('W/"3-')
+    assert headers["Vary"] == "Authorization"
+    assert headers["Cache-Control"] == "private, no-cache"
+    assert headers["Last-Modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert engine.operations == ["findUniqueUserVersion"]
+
+
+async def test_matching_etag_is_not_modified(db, engine):
+    engine.responses["findUniqueUserVersion"] = stamp(3)
+    etag = (await conditional(db))["ETag"]
+
+    with pytest.raises(HTTPException) as raised:
+        await conditional(db, if_none_match=etag)
+
+    assert raised.value.status_code == 304
+    assert raised.value.headers["ETag"] == etag
+    assert raised.value.headers["Vary"] == "Authorization"
+
+
+async def test_a_bump_changes_the_etag(db, engine):
+    engine.responses["findUniqueUserVersion"] = stamp(3)
+    etag = (await conditional(db))["ETag"]
+    engine.responses["findUniqueUserVersion"] = stamp(4)
+
+    headers = await conditional(db, if_none_match=etag)
+
+    assert headers["ETag"] != etag
+
+
+async def test_etags_differ_per_user_and_url(db, engine):
+    engine.responses["findUniqueUserVersion"] = stamp(3)
+    etag = (await conditional(db))["ETag"]
+
+    assert (await conditional(db, user_id="user-2"))["ETag"] != etag
+    assert (await conditional(db, query="limit=20"))["ETag"] != etag
+    # Another user presenting this user's ETag gets a full response
+    await conditional(db, user_id="user-2", if_none_match=etag)
+
+
+async def test_no_stamp_yet(db, engine):
+    headers = await conditional(db)
+
+    assert headers["ETag"].startswith('W/"0-')
+    assert "Last-Modified" not in headers
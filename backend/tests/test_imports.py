@@ -0,0 +1,80 @@
+"""
+Import parsing: rows come out the same whatever the client's chunk
+boundaries, and a bad row is reported by number without stopping the
+rest of the file.
+"""
+import pytest
+
+from app.services import imports
+from app.services.imports import iter_csv_rows, iter_ndjson_rows
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def parse(parser, data: bytes, size: int) -> list:
+    return [row async for row in parser(chunked(data, size))]
+
+
+@pytest.fixture
+def small_records(monkeypatch):
+    monkeypatch.setattr(imports, "MAX_RECORD_SIZE", 50)
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+async def test_csv_quoting(size):
+    data = (
+        b'\xef\xbb\xbfbrandName,notes\r\n'
+        b'Acme,5" screen\n'
+        b'Beta,"two\nlines, ""quoted"""\n'
+        b'\n'
+        b'Gamma,\n'
+    )
+
+    assert await parse(iter_csv_rows, data, size) == [
+        (1, {"brandName": "Acme", "notes": '5" screen'}, None),
+        (2, {"brandName": "Beta", "notes": 'two\nlines, "quoted"'}, None),
+        (3, {"brandName": "Gamma"}, None),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+async def test_csv_oversized_rows_are_skipped(small_records, size):
+    data = (
+        b"brandName,notes\n"
+        b"Acme," + b"x" * 100 + b"\n"
+        b'Beta,"never closed' + b"\nmore" * 20 + b"\n"
+    )
+
+    rows = await parse(iter_csv_rows, data, size)
+
+    assert rows[0] == (1, None, "Row exceeds 50 characters")
+    assert rows[1] == (2, None, "Unterminated quoted field")
+    # Parsing resumes after the unterminated field gives up
+    assert all(error is None for _, _, error in rows[2:])
+
+
+async def test_csv_extra_columns_are_an_error():
+    rows = await parse(iter_csv_rows, b"brandName\nAcme,extra\nBeta\n", 4096)
+
+    assert rows == [
+        (1, None, "Expected 1 columns, got 2"),
+        (2, {"brandName": "Beta"}, None),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+async def test_ndjson_rows(small_records, size):
+    data = b'{"a": 1}\n{"x": "' + b"y" * 100 + b'"}\n\nnot json\n[1]\n{"b": 2}'
+
+    rows = await parse(iter_ndjson_rows, data, size)
+
+    assert rows[0] == (1, {"a": 1}, None)
+    assert rows[1] == (2, None, "Row exceeds 50 characters")
+    assert rows[2][2].startswith("Invalid JSON")
+    assert rows[3] == (4, None, "Expected a JSON object")
+    assert rows[4] == (5, {"b": 2}, None)
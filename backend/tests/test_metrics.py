@@ -0,0 +1,63 @@
+"""
+Metrics.instrument_prisma wraps the private engine.query(content, *,
+tx_id) of prisma-client-py. These tests pin that hook, so a client
+upgrade that renames or reshapes it fails here instead of silently
+reporting zero queries.
+"""
+import inspect
+
+import pytest
+from prisma import Prisma
+
+from app.core.metrics import Metrics, RequestTimings, _current
+from conftest import USER_ID
+
+pytestmark = pytest.mark.anyio
+
+
+def test_engine_query_signature_is_the_one_instrumented():
+    query = Prisma()._engine_class.query
+
+    assert inspect.iscoroutinefunction(query)
+    parameters = inspect.signature(query).parameters
+    assert list(parameters) == ["self", "content", "tx_id"]
+    assert parameters["tx_id"].kind is inspect.Parameter.KEYWORD_ONLY
+
+
+async def test_queries_are_counted_on_the_client_and_in_transactions(db, engine):
+    metrics = Metrics()
+    metrics.instrument_prisma(db)
+
+    await db.deal.find_many(where={"userId": USER_ID})
+    async with db.tx() as tx:
+        await tx.deal.find_many(where={"userId": USER_ID})
+        await tx.execute_raw("SELECT 1")
+
+    assert engine.operations == ["findManyDeal", "findManyDeal", "executeRaw"]
+    assert metrics.db_queries_total == 3
+
+
+async def test_queries_are_counted_against_the_current_request(db, engine):
+    metrics = Metrics()
+    metrics.instrument_prisma(db)
+    timings = RequestTimings()
+
+    token = _current.set(timings)
+    try:
+        await db.deal.find_many(where={"userId": USER_ID})
+    finally:
+        _current.reset(token)
+    await db.deal.find_many(where={"userId": USER_ID})
+
+    assert timings.db_queries == 1
+    assert metrics.db_queries_total == 2
+
+
+async def test_instrumenting_twice_counts_each_query_once(db, engine):
+    metrics = Metrics()
+    metrics.instrument_prisma(db)
+    metrics.instrument_prisma(db)
+
+    await db.deal.find_many(where={"userId": USER_ID})
+
+    assert metrics.db_queries_total == 1
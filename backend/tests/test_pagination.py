@@ -0,0 +1,90 @@
+"""
+Keyset pagination: cursors round-trip through the services, the last
+page has no cursor, and a request without limit or cursor gets the
+whole list.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.api.deps import get_page_params
+from app.core.config import settings
+from app.services.deals import DealService
+from app.services.pagination import decode_cursor, encode_cursor, keyset_where
+from conftest import USER_ID, deal_row
+
+pytestmark = pytest.mark.anyio
+
+NEWEST = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def deals(*deal_ids: int) -> list:
+    # Higher ids are newer, so newest-first order is descending id
+    return [
+        deal_row(deal_id, createdAt=(NEWEST - timedelta(minutes=10 - deal_id)).isoformat())
+        for deal_id in deal_ids
+    ]
+
+
+@pytest.mark.parametrize("value", [NEWEST, Decimal("1500.50"), 42, None])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor("dealValue", value, 7, "asc")
+
+    assert decode_cursor(cursor, "dealValue", "asc") == (value, 7)
+
+
+@pytest.mark.parametrize("sort_field, direction", [("createdAt", "asc"), ("deadline", "desc")])
+def test_cursor_is_tied_to_its_sort(sort_field, direction):
+    cursor = encode_cursor("dealValue", Decimal("1"), 7, "asc")
+
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, sort_field, direction)
+
+
+def test_malformed_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "createdAt")
+
+
+def test_cursor_selects_rows_strictly_after_it():
+    cursor = encode_cursor("createdAt", NEWEST, 7)
+
+    assert keyset_where("createdAt", cursor) == {
+        "OR": [
+            {"createdAt": {"lt": NEWEST}},
+            {"createdAt": NEWEST, "id": {"lt": 7}},
+        ]
+    }
+
+
+async def test_deal_pages_round_trip(db, engine):
+    # Each call returns the look-ahead row the service asks for
+    engine.responses["findManyDeal"] = deals(5, 4, 3)
+    first = await DealService.get_deals(db, USER_ID, limit=2)
+
+    engine.responses["findManyDeal"] = deals(3, 2, 1)
+    second = await DealService.get_deals(db, USER_ID, limit=2, cursor=first.next_cursor)
+
+    engine.responses["findManyDeal"] = deals(1)
+    last = await DealService.get_deals(db, USER_ID, limit=2, cursor=second.next_cursor)
+
+    assert [deal.id for deal in first.items + second.items + last.items] == [5, 4, 3, 2, 1]
+    assert decode_cursor(first.next_cursor, "createdAt")[1] == 4
+    assert decode_cursor(second.next_cursor, "createdAt")[1] == 2
+    assert last.next_cursor is None
+
+
+async def test_without_limit_the_whole_list_is_returned(db, engine):
+    engine.responses["findManyDeal"] = deals(*range(300, 0, -1))
+
+    page = await DealService.get_deals(db, USER_ID, **get_page_params(limit=None, cursor=None))
+
+    assert len(page.items) == 300
+    assert page.next_cursor is None
+
+
+def test_a_cursor_without_limit_uses_the_default_page_size():
+    assert get_page_params(limit=None, cursor="abc") == {
+        "limit": settings.PAGE_SIZE_DEFAULT, "cursor": "abc"
+    }
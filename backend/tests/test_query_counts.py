@@ -0,0 +1,107 @@
+"""
+Round trips to the database per service call, counted at the Prisma
+engine. List and detail reads must not grow with the number of rows
+(no N+1); writes have a fixed budget per call.
+"""
+import asyncio
+
+import pytest
+
+from app.models.payment import PaymentCreate, PaymentUpdate
+from app.services.deals import DealService
+from app.services.payments import PaymentService
+from conftest import USER_ID, deal_row, payment_row, raw_rows
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_deal_list_with_relations_is_one_query(db, engine):
+    engine.responses["findManyDeal"] = [
+        deal_row(
+            deal_id,
+            payments=[payment_row(deal_id * 10 + n, deal_id) for n in range(3)],
+            contracts=[],
+            reminders=[],
+        )
+        for deal_id in range(1, 51)
+    ]
+
+    page = await DealService.get_deals(
+        db, USER_ID, limit=100, include=("payments", "contracts", "reminders")
+    )
+
+    assert len(page.items) == 50
+    assert engine.operations == ["findManyDeal"]
+
+
+async def test_deal_detail_with_relations_is_one_query(db, engine):
+    engine.responses["findFirstDeal"] = deal_row(
+        1, payments=[payment_row(n) for n in range(5)], contracts=[], reminders=[]
+    )
+
+    deal = await DealService.get_deal(db, 1, USER_ID, ("payments", "contracts", "reminders"), cached=False)
+
+    assert len(deal.payments) == 5
+    assert engine.operations == ["findFirstDeal"]
+
+
+async def test_concurrent_deal_lookups_share_one_query(db, engine):
+    engine.responses["findManyDeal"] = [deal_row(deal_id) for deal_id in range(1, 11)]
+
+    deals = await asyncio.gather(*(
+        DealService.get_deal(db, deal_id, USER_ID, cached=False) for deal_id in range(1, 11)
+    ))
+
+    assert [deal.id for deal in deals] == list(range(1, 11))
+    assert engine.operations == ["findManyDeal"]
+
+
+async def test_payment_list_is_one_query(db, engine):
+    engine.responses["findManyPayment"] = [payment_row(n, deal_id=n) for n in range(1, 51)]
+
+    page = await PaymentService.get_payments(db, USER_ID, limit=100)
+
+    assert len(page.items) == 50
+    assert engine.operations == ["findManyPayment"]
+
+
+async def test_create_payment_round_trips(db, engine):
+    engine.responses["queryRaw"] = raw_rows({"id": 1})
+    engine.responses["createOnePayment"] = payment_row(1)
+
+    payment = await PaymentService.create_payment(
+        db, USER_ID, PaymentCreate(dealId=1, amount="250.00")
+    )
+
+    assert payment.id == 1
+    # Lock the deal, insert, one rollup delta, version bump
+    assert engine.operations == ["queryRaw", "createOnePayment", "executeRaw", "executeRaw"]
+
+
+async def test_update_payment_round_trips(db, engine):
+    engine.responses["queryRaw"] = raw_rows({"id": 1, "paid": False, "amount": "250.00"})
+    engine.responses["updateOnePayment"] = payment_row(1, paid=True)
+
+    payment = await PaymentService.update_payment(db, 1, USER_ID, PaymentUpdate(paid=True))
+
+    assert payment.paid
+    # Lock, update, paid/outstanding change in one rollup statement, version bump
+    assert engine.operations == ["queryRaw", "updateOnePayment", "executeRaw", "executeRaw"]
+
+
+async def test_batch_payment_update_round_trips(db, engine):
+    engine.responses["findManyPayment"] = [payment_row(n, deal_id=1) for n in range(1, 6)]
+    engine.responses["queryRaw"] = raw_rows({"id": 1, "paid": False, "amount": "250.00"})
+    engine.responses["updateOnePayment"] = payment_row(1, paid=True)
+
+    updated = await PaymentService.update_payments(
+        db, USER_ID, [(n, PaymentUpdate(paid=True)) for n in range(1, 6)]
+    )
+
+    assert all(updated)
+    # Find and lock the one deal, two per payment, one rollup statement, one bump
+    assert engine.operations == (
+        ["findManyPayment", "queryRaw"]
+        + ["queryRaw", "updateOnePayment"] * 5
+        + ["executeRaw", "executeRaw"]
+    )
@@ -0,0 +1,103 @@
+"""
+Query plan regression check: every AUDIT_STEPS service call runs against
+seeded data in a real Postgres database, and any statement the Prisma
+engine sends for it that EXPLAIN shows scanning or sorting where an index
+should serve fails the test. Skipped unless QUERY_AUDIT_DATABASE_URL
+points at a disposable database with the schema pushed; conftest fills in
+DATABASE_URL for the stubbed tests, so that variable cannot be the switch.
+"""
+import itertools
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+import pytest
+from prisma import Prisma
+
+from app.services.deals import SORT_FIELDS, DealService
+from app.services.query_audit import AuditStep, EngineQueryLog, QueryAudit
+
+DATABASE_URL = os.environ.get("QUERY_AUDIT_DATABASE_URL")
+USERS = 50
+DEALS_PER_USER = 400
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not DATABASE_URL, reason="QUERY_AUDIT_DATABASE_URL is not set"),
+]
+
+NOW = datetime.now(timezone.utc)
+
+# GET /deals filters, alone and combined
+DEAL_FILTERS = {
+    "no filter": {},
+    "status": {"status": "signed"},
+    "platform": {"platform": "youtube"},
+    "status and platform": {"status": "signed", "platform": "youtube"},
+    "deadline range": {"deadline_from": NOW, "deadline_to": NOW + timedelta(days=30)},
+    "value range": {"min_value": Decimal("1000"), "max_value": Decimal("2000")},
+}
+
+
+def deal_list_step(filter_name: str, filters: dict, sort: str, order: str) -> AuditStep:
+    # Only scans matter here; sorting a user's filtered rows is allowed
+    return AuditStep(
+        f"GET /deals {filter_name}, sort={sort} order={order}",
+        lambda tx, s: DealService.get_deals(tx, s["user_id"], limit=100, filters=filters, sort=sort, order=order),
+        allow_sort=True,
+    )
+
+
+DEAL_LIST_STEPS = [
+    deal_list_step(filter_name, filters, sort, order)
+    for (filter_name, filters), sort, order in itertools.product(
+        DEAL_FILTERS.items(), SORT_FIELDS, ("asc", "desc")
+    )
+]
+
+
+class Report:
+    """Collects flagged statements with their SQL for the failure message."""
+
+    def __init__(self):
+        self.flagged: List[str] = []
+
+    def __call__(self, name: str, sql: str, plan: Optional[dict], problems: List[str]) -> None:
+        if problems:
+            self.flagged.append(f"{name}: {'; '.join(problems)}\n{sql}")
+
+    def __str__(self) -> str:
+        return "\n\n".join(self.flagged)
+
+
+@pytest.fixture
+async def audit_db(capfd):
+    # Spawned while capfd holds stdout, so the engine's query log goes there
+    db = Prisma(log_queries=True, datasource={"url": DATABASE_URL})
+    await db.connect()
+    try:
+        yield db, EngineQueryLog(lambda: capfd.readouterr().out)
+    finally:
+        await db.disconnect()
+
+
+async def test_no_audited_statement_is_flagged(audit_db):
+    db, log = audit_db
+    report = Report()
+
+    results = await QueryAudit.run(db, log, USERS, DEALS_PER_USER, on_result=report)
+
+    assert results, "No statements were captured; is the engine writing its query log?"
+    assert not report.flagged, str(report)
+
+
+async def test_deal_list_views_never_scan_deals(audit_db):
+    db, log = audit_db
+    report = Report()
+
+    results = await QueryAudit.run(db, log, USERS, DEALS_PER_USER, on_result=report, steps=DEAL_LIST_STEPS)
+
+    assert results, "No statements were captured; is the engine writing its query log?"
+    scans = [entry for entry in report.flagged if "Seq Scan on deals" in entry]
+    assert not scans, "\n\n".join(scans)
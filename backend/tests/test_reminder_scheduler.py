@@ -0,0 +1,109 @@
+"""
+Reminder dispatch: reminders are marked sent only after the notifier
+accepts them, and anything due that was not dispatched stays scheduled.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.core.database import db_pool
+from app.models.reminder import ReminderCreate
+from app.services.reminder_scheduler import (
+    CLAIM_LEASE, RETRY_BASE, MemoryNotifier, ReminderScheduler, _utcnow
+)
+from app.services.reminders import ReminderService
+from conftest import CREATED_AT, USER_ID, raw_rows, reminder_row
+
+pytestmark = pytest.mark.anyio
+
+
+class FailingNotifier:
+    async def send(self, reminders) -> None:
+        raise RuntimeError("channel down")
+
+
+def claimed(*reminder_ids: int) -> list:
+    return raw_rows(*(
+        {
+            "id": reminder_id,
+            "user_id": USER_ID,
+            "deal_id": None,
+            "type": "payment",
+            "title": f"Reminder {reminder_id}",
+            "remind_at": CREATED_AT,
+            "created_at": CREATED_AT,
+        }
+        for reminder_id in reminder_ids
+    ))
+
+
+def scheduler(notifier) -> ReminderScheduler:
+    return ReminderScheduler(notifier, horizon=600, batch_size=10, max_age=86400)
+
+
+def due_rows(*reminder_ids: int) -> list:
+    remind_at = (_utcnow() - timedelta(seconds=1)).isoformat()
+    return [reminder_row(reminder_id, remind_at) for reminder_id in reminder_ids]
+
+
+async def test_dispatch_marks_sent_after_the_notifier(db, engine):
+    engine.responses["findManyReminder"] = due_rows(1, 2)
+    engine.responses["queryRaw"] = claimed(1, 2)
+    engine.responses["updateManyReminder"] = {"count": 2}
+    notifier = MemoryNotifier()
+    worker = scheduler(notifier)
+
+    await worker.refill(db)
+    assert await worker.dispatch_due(db) == 2
+
+    assert [reminder.id for reminder in notifier.sent] == [1, 2]
+    # Claim, mark sent, one version bump for the one owner
+    assert engine.operations == ["findManyReminder", "queryRaw", "updateManyReminder", "executeRaw"]
+    assert worker._next_due() is None
+
+
+async def test_failed_dispatch_is_retried_with_backoff(db, engine):
+    engine.responses["findManyReminder"] = due_rows(1)
+    engine.responses["queryRaw"] = claimed(1)
+    engine.responses["updateManyReminder"] = {"count": 1}
+    worker = scheduler(FailingNotifier())
+    await worker.refill(db)
+
+    for attempt in range(2):
+        started = _utcnow()
+        with pytest.raises(RuntimeError):
+            await worker.dispatch_due(db)
+        retry_at = worker._next_due()
+        assert retry_at is not None
+        assert retry_at - started >= RETRY_BASE * 2 ** attempt
+
+    # Never marked sent, and no version bump
+    assert "executeRaw" not in engine.operations
+
+
+async def test_due_reminders_leased_elsewhere_wait_for_the_lease(db, engine, monkeypatch):
+    monkeypatch.setattr(db_pool, "client", db)
+    engine.responses["findManyReminder"] = due_rows(1)
+    # Nothing claimable: another worker holds the lease
+    worker = scheduler(MemoryNotifier())
+
+    started = _utcnow()
+    worker.start()
+    while "queryRaw" not in engine.operations:
+        await asyncio.sleep(0.01)
+    await worker.stop()
+
+    assert engine.operations == ["findManyReminder", "queryRaw"]
+    assert worker._next_due() >= started + CLAIM_LEASE
+
+
+async def test_create_reminder_bumps_the_version_in_its_transaction(db, engine):
+    engine.responses["createOneReminder"] = reminder_row(1)
+
+    await ReminderService.create_reminder(
+        db, USER_ID, ReminderCreate(type="payment", title="Invoice", remindAt=CREATED_AT)
+    )
+
+    assert engine.transactions == 1
+    assert engine.operations == ["createOneReminder", "executeRaw"]
@@ -0,0 +1,68 @@
+"""
+Single-flight list GETs: identical concurrent requests run one query,
+and a request that joins gives its pool slot back while it waits.
+"""
+import asyncio
+from functools import partial
+
+import pytest
+
+from app.api.deps import Flight, paginate, single_flight
+from app.core.database import DatabasePool
+from app.models.deal import DealResponse
+from app.services.deals import DealService
+from conftest import USER_ID, deal_row
+
+pytestmark = pytest.mark.anyio
+
+URL = "/api/v1/deals?limit=100"
+
+
+@pytest.fixture
+def pool(db) -> DatabasePool:
+    pool = DatabasePool(size=2, timeout=1.0)
+    pool.client = db
+    return pool
+
+
+async def request(db, pool: DatabasePool, etag: str = 'W/"1"'):
+    slot = pool.slot()
+    await slot.acquire()
+    try:
+        return await paginate(
+            partial(DealService.get_deals, db, USER_ID, limit=100),
+            DealResponse,
+            {"ETag": etag},
+            Flight(USER_ID, URL, slot)
+        )
+    finally:
+        slot.release()
+
+
+async def test_identical_requests_share_one_query(db, engine, pool):
+    engine.responses["findManyDeal"] = [deal_row(1), deal_row(2)]
+
+    first, second = await asyncio.gather(request(db, pool), request(db, pool))
+
+    assert first.body == second.body
+    assert engine.operations == ["findManyDeal"]
+    # The follower gave its slot back while waiting and took it again
+    assert pool.acquired_total == 3
+    assert pool.stats()["in_use"] == 0
+
+
+async def test_a_new_version_does_not_join(db, engine, pool):
+    await asyncio.gather(request(db, pool, 'W/"1"'), request(db, pool, 'W/"2"'))
+
+    assert engine.operations == ["findManyDeal", "findManyDeal"]
+
+
+async def test_a_mutation_detaches_running_computations(db, engine, pool):
+    leader = asyncio.ensure_future(request(db, pool))
+    # Let the leader register its computation
+    await asyncio.sleep(0)
+    single_flight.invalidate(USER_ID)
+
+    await asyncio.gather(leader, request(db, pool))
+
+    assert engine.operations == ["findManyDeal", "findManyDeal"]
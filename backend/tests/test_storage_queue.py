@@ -0,0 +1,121 @@
+"""
+Contract file deletion outbox: deletes are queued in the database
+transaction, drained with one storage call per batch, retried with
+backoff, and orphaned files are found by reconcile.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import pytest
+
+from app.services.contracts import ContractService
+from app.services.storage import StorageService
+from app.services.storage_queue import MAX_RETRY_DELAY, StorageDeletionQueue
+from conftest import CREATED_AT, USER_ID, raw_rows
+
+pytestmark = pytest.mark.anyio
+
+LONG_AGO = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class MemoryStorage(StorageService):
+    """Objects kept in a dict of path -> created time."""
+
+    def __init__(self, files: Dict[str, datetime] = None, fail: bool = False):
+        self.files = dict(files or {})
+        self.fail = fail
+        self.removals: List[List[str]] = []
+
+    async def list_files(self, prefix: str) -> List[Tuple[str, datetime]]:
+        prefix = prefix.strip("/")
+        entries = {}
+        for path, created in self.files.items():
+            if not path.startswith(prefix + "/"):
+                continue
+            head, _, rest = path[len(prefix) + 1:].partition("/")
+            if rest:
+                entries[f"{prefix}/{head}/"] = datetime.now(timezone.utc)
+            else:
+                entries[path] = created
+        return sorted(entries.items())
+
+    async def _write(self, path, chunks) -> None:
+        self.files[path] = datetime.now(timezone.utc)
+
+    async def _remove(self, paths: List[str]) -> None:
+        self.removals.append(paths)
+        if self.fail:
+            raise RuntimeError("storage unavailable")
+        for path in paths:
+            self.files.pop(path, None)
+
+    def get_public_url(self, path: str) -> str:
+        return f"https://storage.test/object/public/contracts/{path}"
+
+
+def queued(*rows: Tuple[int, str, int]) -> list:
+    storage = MemoryStorage()
+    return raw_rows(*(
+        {"id": row_id, "file_url": storage.get_public_url(path), "attempts": attempts}
+        for row_id, path, attempts in rows
+    ))
+
+
+async def test_drain_removes_a_batch_in_one_call(db, engine):
+    storage = MemoryStorage({"u/1/a.pdf": LONG_AGO, "u/1/b.pdf": LONG_AGO})
+    engine.responses["queryRaw"] = queued((1, "u/1/a.pdf", 0), (2, "u/1/b.pdf", 0))
+    engine.responses["deleteManyStorageDeletion"] = {"count": 2}
+
+    claimed = await StorageDeletionQueue.drain_once(db, storage, batch_size=10, retry_base=5)
+
+    assert claimed == 2
+    assert storage.removals == [["u/1/a.pdf", "u/1/b.pdf"]]
+    assert storage.files == {}
+    assert engine.operations == ["queryRaw", "deleteManyStorageDeletion"]
+
+
+async def test_failed_drain_reschedules_each_row(db, engine):
+    storage = MemoryStorage(fail=True)
+    engine.responses["queryRaw"] = queued((1, "u/1/a.pdf", 0), (2, "u/1/b.pdf", 2))
+    engine.responses["updateManyStorageDeletion"] = {"count": 1}
+
+    claimed = await StorageDeletionQueue.drain_once(db, storage, batch_size=10, retry_base=5)
+
+    assert claimed == 2
+    # One reschedule per attempt count, rows stay queued
+    assert engine.operations == ["queryRaw", "updateManyStorageDeletion", "updateManyStorageDeletion"]
+
+
+def test_retry_delay_backs_off_up_to_the_cap():
+    assert StorageDeletionQueue.retry_delay(0, 5) == timedelta(seconds=5)
+    assert StorageDeletionQueue.retry_delay(3, 5) == timedelta(seconds=40)
+    assert StorageDeletionQueue.retry_delay(30, 5) == MAX_RETRY_DELAY
+
+
+async def test_reconcile_queues_orphans_only(db, engine):
+    storage = MemoryStorage({
+        f"{USER_ID}/1/kept.pdf": LONG_AGO,
+        f"{USER_ID}/1/orphan.pdf": LONG_AGO,
+        # Too new: its contract row may not be written yet
+        f"{USER_ID}/2/uploading.pdf": datetime.now(timezone.utc),
+    })
+    engine.responses["findManyContract"] = [{
+        "id": 1,
+        "dealId": 1,
+        "fileUrl": storage.get_public_url(f"{USER_ID}/1/kept.pdf"),
+        "fileName": "kept.pdf",
+        "usageEndDate": None,
+        "exclusivityEndDate": None,
+        "createdAt": CREATED_AT,
+    }]
+
+    orphans = await StorageDeletionQueue.reconcile(db, storage, USER_ID)
+
+    assert orphans == [f"{USER_ID}/1/orphan.pdf"]
+    assert engine.operations == ["findManyContract", "findManyStorageDeletion", "executeRaw"]
+
+
+async def test_deleting_a_contract_queues_its_file_in_the_same_statement(db, engine):
+    assert await ContractService.delete_contract(db, 1, USER_ID)
+
+    assert engine.operations == ["executeRaw"]